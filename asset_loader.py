@@ -0,0 +1,46 @@
+"""
+Background asset loading on a thread pool.
+
+Start-up used to decode every image (the spritesheets one after another, then
+sea-grass, coral and both filter images) before the first frame could be drawn.
+An AssetLoader runs each load as a task on a pool of threads, so the main loop
+can start drawing straight away and pick up each asset as its task finishes.
+PNG decoding and copying pixels out of the memory-mapped frame cache mostly run
+outside the GIL, so the tasks also spread over spare cores.
+
+Tasks are keyed, so the main thread can ask whether one is ready() and take its
+result() (which re-raises any error from loading on the main thread).
+progress() is (tasks finished, tasks submitted) for a loading indicator.
+
+Only decode on the loader. Converting to the display format (convert_alpha)
+stays with whoever picks the result up on the main thread. Frame sets too: the
+loader packs them (FrameProvider.prepare) and the main thread converts and cuts
+them (FrameProvider.get_set).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AssetLoader:
+    def __init__(self, max_workers=None):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="assets")
+        self.futures = {}  # key -> Future
+
+    def submit(self, key, fn, *args):
+        """Runs fn(*args) on the pool as task key"""
+        self.futures[key] = self.executor.submit(fn, *args)
+
+    def ready(self, key):
+        return self.futures[key].done()
+
+    def result(self, key):
+        """Result of task key, waiting for it if need be"""
+        return self.futures[key].result()
+
+    def progress(self):
+        done = sum(future.done() for future in self.futures.values())
+        return done, len(self.futures)
+
+    def shutdown(self):
+        """Drops tasks not yet started and lets the running ones finish"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,123 @@
+"""
+Blit throughput of the fish frame representations.
+
+Blits every frame of all six fish types many times onto a display-format
+surface the size of the screen, once per representation,
+
+    plain       SRCALPHA surfaces from get_frames (one pixel buffer per frame)
+    subsurface  subsurfaces of a display-format FrameAtlas
+    area        the FrameAtlas surface blitted with a source rect per frame
+    rle         RLE accelerated frames cut from a FrameAtlas
+
+and reports microseconds per blit, speed-up over plain and the bytes of pixel
+buffers the frames hold.
+
+    python bench_blits.py --size FIFTH --blits 50000
+"""
+
+import os
+
+# must be set before the pygame display is initialised
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import random
+import time
+import pygame as pg
+from frame_atlas import FrameAtlas
+from frame_cache import load_sheet
+from kiss_fish_ai_animated import SCREEN_WIDTH, SCREEN_HEIGHT
+from spritesheet_reader import get_frame_rects, get_frames, get_spritesheet_path
+
+DEFAULT_BLITS = 50000
+SEED = 1234
+
+
+def surface_bytes(surface):
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+def load_representations(size):
+    """
+    Returns {name: (blit args list, pixel bytes)}, where each blit args entry is
+    (source, area) for one frame, in the same frame order for every name.
+    """
+    plain_frames = get_frames(size)
+    keys = sorted(plain_frames)
+    plain = [(frame, None) for key in keys for frame in plain_frames[key]]
+    plain_bytes = sum(surface_bytes(frame) for frame, area in plain)
+    reps = {"plain": (plain, plain_bytes)}
+    subsurface, area, rle = [], [], []
+    atlas_bytes = 0
+    for i in range(1, 7):
+        fish_num = str(i)
+        frame_rects = get_frame_rects(size, fish_num)
+        sheet = load_sheet(get_spritesheet_path(size, fish_num), frame_rects)
+        spritesheet = sheet.band(0, sheet.size[1])
+        atlas = FrameAtlas(spritesheet, frame_rects, "subsurface")
+        rle_atlas = FrameAtlas(spritesheet, frame_rects, "rle")
+        atlas_bytes += surface_bytes(atlas.surface)
+        for key in sorted(frame_rects):
+            subsurface += [(frame, None) for frame in atlas.get_frames(key)]
+            area += [(atlas.surface, rect) for rect in atlas.frame_rects[key]]
+            rle += [(frame, None) for frame in rle_atlas.get_frames(key)]
+    reps["subsurface"] = (subsurface, atlas_bytes)
+    reps["area"] = (area, atlas_bytes)
+    # RLE frames keep only their encoded runs, which pygame does not expose
+    reps["rle"] = (rle, None)
+    return reps
+
+
+def time_blits(frames, positions, target):
+    """Returns seconds to blit frames[i % len(frames)] at every position"""
+    n = len(frames)
+    blit = target.blit
+    start = time.perf_counter()
+    for i, pos in enumerate(positions):
+        source, area = frames[i % n]
+        blit(source, pos, area)
+    return time.perf_counter() - start
+
+
+def run(size="FIFTH", num_blits=DEFAULT_BLITS, verbose=True):
+    """Returns {name: {"us_per_blit": ..., "speedup": ..., "bytes": ...}}"""
+    target = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    rng = random.Random(SEED)
+    positions = [
+        (rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT))
+        for _ in range(num_blits)
+    ]
+    results = {}
+    for name, (frames, num_bytes) in load_representations(size).items():
+        time_blits(frames, positions[:1000], target)  # warm up
+        elapsed = time_blits(frames, positions, target)
+        results[name] = {"us_per_blit": 1e6 * elapsed / num_blits, "bytes": num_bytes}
+    plain_us = results["plain"]["us_per_blit"]
+    for r in results.values():
+        r["speedup"] = plain_us / r["us_per_blit"]
+    if verbose:
+        print(f"{size} frames, {num_blits} blits per representation")
+        for name, r in results.items():
+            mb = "n/a" if r["bytes"] is None else f"{r['bytes'] / 2**20:.1f} MB"
+            print(
+                f"  {name:10s} {r['us_per_blit']:7.2f} us/blit  "
+                f"x{r['speedup']:5.2f}  pixels {mb}"
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--size", default="FIFTH", help="spritesheet size")
+    parser.add_argument("--blits", type=int, default=DEFAULT_BLITS)
+    args = parser.parse_args()
+    pg.display.init()
+    # convert_alpha needs a display mode
+    pg.display.set_mode((1, 1))
+    run(args.size.upper(), args.blits)
+
+
+if __name__ == "__main__":
+    main()
+    pg.quit()
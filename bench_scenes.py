@@ -0,0 +1,201 @@
+"""
+End-to-end benchmarks of canned aquarium scenes.
+
+Each scene builds a kiss_fish_ai_animated.Aquarium and drives its real update and
+draw path against an offscreen surface for a fixed number of frames with a fixed
+dt, timing update and draw separately.
+
+    python bench_scenes.py --save            # record bench_baseline.json
+    python bench_scenes.py                   # compare against it
+    python bench_scenes.py --scenes fish_50,fish_500 --tolerance 0.1
+
+When comparing, a scene fails if its median frame time is more than tolerance
+(a fraction, default 0.15) slower than the baseline, and the script exits with
+status 1 so it can gate changes to the render loop or Fish.update.
+Baselines are machine specific, so record one on the machine you compare on.
+"""
+
+import os
+
+# must be set before the pygame display is initialised
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import pygame as pg
+import kiss_fish_ai_animated as aquarium
+from spritesheet_reader import SHEET_INFO
+
+BASELINE_PATH = "bench_baseline.json"
+DEFAULT_TOLERANCE = 0.15
+DEFAULT_FRAMES = 300
+WARMUP_FRAMES = 30
+SEED = 1234
+
+DEFAULT_SCENE = {
+    "num_fish": 50,
+    "size": "FIFTH",
+    "overlay": True,
+    "scenery": True,
+    "heavy_bubbles": False,
+    "dirty_rects": False,
+}
+
+SCENES = {
+    "fish_50": {"num_fish": 50},
+    "fish_500": {"num_fish": 500},
+    "fish_5000": {"num_fish": 5000},
+    "fish_500_no_overlay": {"num_fish": 500, "overlay": False},
+    "bubbles_500": {"num_fish": 500, "heavy_bubbles": True},
+    "fish_50_dirty": {"num_fish": 50, "dirty_rects": True},
+    "fish_500_dirty": {"num_fish": 500, "dirty_rects": True},
+}
+for size in SHEET_INFO:
+    SCENES["size_" + size.lower()] = {"num_fish": 200, "size": size}
+
+
+def sheets_available(size):
+    info = SHEET_INFO[size]
+    return all(
+        os.path.exists(
+            os.path.join("fish spritesheets", info["DIR"], info["STEM"] + f"{i}.png")
+        )
+        for i in range(1, 7)
+    )
+
+
+def run_scene(name, frames=DEFAULT_FRAMES, dt=1 / aquarium.FPS):
+    """Runs one scene and returns its timing results (ms) as a dict"""
+    scene = {**DEFAULT_SCENE, **SCENES[name]}
+    surface = pg.Surface((aquarium.SCREEN_WIDTH, aquarium.SCREEN_HEIGHT))
+    tank = aquarium.Aquarium(
+        surface,
+        num_fish=scene["num_fish"],
+        size=scene["size"],
+        scenery=scene["scenery"],
+        overlay=scene["overlay"],
+        seed=SEED,
+    )
+    clock = tank.clock
+    update_times = np.zeros(frames)
+    draw_times = np.zeros(frames)
+    for frame in range(-WARMUP_FRAMES, frames):
+        clock.tick(dt)
+        if scene["heavy_bubbles"]:
+            # start a new burst for every fish as soon as the last one is over
+            for fish in tank.fish_sprites:
+                if not fish.bubbling:
+                    tank.bubble_burst(clock.now, fish, repeat=False)
+        t0 = time.perf_counter()
+        tank.update()
+        t1 = time.perf_counter()
+        tank.animate_scenery()
+        if scene["dirty_rects"]:
+            tank.draw_dirty(surface)
+        else:
+            tank.draw(surface)
+        t2 = time.perf_counter()
+        if frame >= 0:
+            update_times[frame] = t1 - t0
+            draw_times[frame] = t2 - t1
+    frame_times = 1000 * (update_times + draw_times)
+    return {
+        "num_fish": tank.num_fish,
+        "frames": frames,
+        "frame_ms_median": float(np.median(frame_times)),
+        "frame_ms_mean": float(frame_times.mean()),
+        "frame_ms_p95": float(np.percentile(frame_times, 95)),
+        "update_ms_median": float(1000 * np.median(update_times)),
+        "draw_ms_median": float(1000 * np.median(draw_times)),
+        "final_bubbles": len(tank.bubbles),
+    }
+
+
+def run_scenes(names, frames=DEFAULT_FRAMES, verbose=True):
+    results = {}
+    for name in names:
+        size = {**DEFAULT_SCENE, **SCENES[name]}["size"]
+        if not sheets_available(size):
+            if verbose:
+                print(f"{name:22s} skipped: {size} spritesheets not found")
+            continue
+        results[name] = run_scene(name, frames)
+        if verbose:
+            r = results[name]
+            print(
+                f"{name:22s} {r['num_fish']:5d} fish  "
+                f"frame {r['frame_ms_median']:7.2f} ms (p95 {r['frame_ms_p95']:7.2f})  "
+                f"update {r['update_ms_median']:6.2f}  draw {r['draw_ms_median']:6.2f}"
+            )
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares median frame times with baseline.
+    Returns list of (scene, baseline ms, current ms) for scenes that regressed.
+    """
+    regressions = []
+    for name, r in results.items():
+        if name not in baseline:
+            print(f"{name:22s} no baseline")
+            continue
+        old = baseline[name]["frame_ms_median"]
+        new = r["frame_ms_median"]
+        change = (new - old) / old
+        status = "FAIL" if change > tolerance else "ok"
+        print(f"{name:22s} {old:7.2f} -> {new:7.2f} ms ({change:+.1%}) {status}")
+        if change > tolerance:
+            regressions.append((name, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--scenes", help="comma separated, default all")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    names = args.scenes.split(",") if args.scenes else list(SCENES)
+    unknown = [name for name in names if name not in SCENES]
+    if unknown:
+        parser.error(f"unknown scenes {unknown}, choose from {list(SCENES)}")
+
+    pg.display.init()
+    # a display mode is needed for convert_alpha on the scenery images
+    pg.display.set_mode((1, 1))
+    results = run_scenes(names, args.frames)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"\ncomparing with {args.baseline} (tolerance {args.tolerance:.0%})")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} scene(s) slower than baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    status = main()
+    pg.quit()
+    sys.exit(status)
@@ -0,0 +1,117 @@
+"""
+Throughput of the FishEngine step sharded across worker processes.
+
+Steps the same population of fish with the in-process FishEngine and then with
+a ShardedFishEngine of 1, 2, ... up to --max-workers processes (default: the
+number of cores), and reports fish-steps per second, mean step latency and the
+speed-up over in-process for each. Each is run twice: with every fish plain,
+and with a PREDATOR_FRACTION of them predators (as fish type "6" is in a
+tank), so the pursuit and flight steering is timed too.
+
+    python bench_shards.py --fish 100000 --steps 200
+
+Only the engine step is timed, not sprites or drawing. This is the part
+sharding spreads over the cores. Expect speed-ups only once shards are large
+enough for the barrier round trip (tens of microseconds) to be small next to a
+step.
+"""
+
+import os
+
+# must be set before the pygame display is initialised
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import time
+import numpy as np
+from fish_engine import FishEngine
+from sharded_engine import ShardedFishEngine
+from kiss_fish_ai_animated import Fish, FPS, SCREEN_WIDTH, SCREEN_HEIGHT
+
+DEFAULT_FISH = 20000
+DEFAULT_STEPS = 200
+WARMUP_STEPS = 10
+SEED = 1234
+PREDATOR_FRACTION = 1 / 6
+CASES = {"no predators": 0, "predators": PREDATOR_FRACTION}
+
+
+def populate(engine, num_fish, rng, predator_fraction=0):
+    pos = rng.uniform((0, 0), (SCREEN_WIDTH, SCREEN_HEIGHT), (num_fish, 2))
+    angle = rng.uniform(0, 2 * np.pi, num_fish)
+    speed = rng.uniform(Fish.DEFAULT_PARAMS["min_speed_swim"], 60, num_fish)
+    vel = speed[:, None] * np.stack((np.cos(angle), np.sin(angle)), axis=1)
+    target = rng.uniform((0, 0), (SCREEN_WIDTH, SCREEN_HEIGHT), (num_fish, 2))
+    num_predators = round(predator_fraction * num_fish)
+    predator_params = dict(Fish.DEFAULT_PARAMS, predator=True)
+    for i in range(num_fish):
+        params = predator_params if i < num_predators else Fish.DEFAULT_PARAMS
+        engine.add(params, pos[i], vel[i], target[i], (20, 15), 0)
+
+
+def time_steps(engine, num_steps, dt=1 / FPS):
+    """Returns seconds per step, after a warm-up"""
+    now = 0
+    for _ in range(WARMUP_STEPS):
+        now += 1000 * dt
+        engine.step(dt, now)
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        now += 1000 * dt
+        engine.step(dt, now)
+    return (time.perf_counter() - start) / num_steps
+
+
+def run(
+    num_fish=DEFAULT_FISH,
+    num_steps=DEFAULT_STEPS,
+    max_workers=None,
+    predator_fraction=0,
+):
+    """Returns {workers: {"step_ms": ..., "fish_steps_per_sec": ..., "speedup": ...}}"""
+    max_workers = max_workers or os.cpu_count() or 1
+    results = {}
+    for workers in range(max_workers + 1):
+        rng = np.random.default_rng(SEED)
+        if workers:
+            engine = ShardedFishEngine(
+                SCREEN_WIDTH, SCREEN_HEIGHT, num_fish, workers, rng=rng
+            )
+        else:
+            engine = FishEngine(SCREEN_WIDTH, SCREEN_HEIGHT, num_fish, rng=rng)
+        populate(engine, num_fish, rng, predator_fraction)
+        seconds = time_steps(engine, num_steps)
+        engine.close()
+        results[workers] = {
+            "step_ms": 1000 * seconds,
+            "fish_steps_per_sec": num_fish / seconds,
+        }
+    in_process = results[0]["step_ms"]
+    for r in results.values():
+        r["speedup"] = in_process / r["step_ms"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--fish", type=int, default=DEFAULT_FISH)
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS)
+    parser.add_argument(
+        "--max-workers", type=int, default=None, help="default: number of cores"
+    )
+    args = parser.parse_args()
+    print(f"{args.fish} fish, {args.steps} steps, {os.cpu_count()} cores")
+    for case, predator_fraction in CASES.items():
+        results = run(args.fish, args.steps, args.max_workers, predator_fraction)
+        print(f"{case}:")
+        for workers, r in results.items():
+            name = f"{workers} workers" if workers else "in-process"
+            print(
+                f"  {name:12s} {r['step_ms']:8.3f} ms/step  "
+                f"{r['fish_steps_per_sec']:12.0f} fish-steps/s  x{r['speedup']:5.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
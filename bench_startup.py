@@ -0,0 +1,137 @@
+"""
+Start-up cost: import time per module and time to the first drawn frame.
+
+Each measurement runs in a fresh interpreter, since imports are cached, and
+takes the best of --runs runs.
+
+    import        ms to import each module in IMPORT_BUDGET_MS, less the cost
+                  of starting the interpreter
+    first frame   ms from the start of the script to the first aquarium frame
+                  on the display, loading synchronously and with an AssetLoader.
+                  With the loader this frame is drawn before any species has
+                  loaded, so the tank is still empty
+    first fish    ms from the start of the script to the first frame with fish
+                  in it, i.e. until the first species has loaded and spawned
+
+Each figure is checked against its budget. The exit status is 1 if any is over.
+
+    python bench_startup.py --runs 5
+"""
+
+import os
+
+# must be set before the pygame display is initialised
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import subprocess
+import sys
+import time
+
+DEFAULT_RUNS = 5
+
+# most of these are numpy and pygame, which every module past the data tables
+# needs; the budgets catch a module starting to do work (or import much more)
+IMPORT_BUDGET_MS = {
+    "fish_properties": 10,
+    "sim_random": 120,
+    "fish_engine": 120,
+    "spritesheet_reader": 280,
+    "kiss_fish_ai_animated": 300,
+}
+FIRST_FRAME_BUDGET_MS = {"sync": 900, "loader": 450}
+FIRST_FISH_BUDGET_MS = {"sync": 900, "loader": 900}
+
+FIRST_FRAME_CODE = """
+import time
+start = time.perf_counter()
+import pygame as pg
+import kiss_fish_ai_animated as aquarium
+from asset_loader import AssetLoader
+pg.display.init()
+screen = pg.display.set_mode((aquarium.SCREEN_WIDTH, aquarium.SCREEN_HEIGHT))
+loader = AssetLoader() if {use_loader} else None
+tank = aquarium.Aquarium(screen, loader=loader)
+tank.poll_assets()
+tank.draw(screen)
+pg.display.flip()
+print(1000 * (time.perf_counter() - start))
+while not tank.fish_sprites and tank.pending_assets:
+    tank.poll_assets()
+    tank.draw(screen)
+    pg.display.flip()
+print(1000 * (time.perf_counter() - start))
+if loader is not None:
+    loader.shutdown()
+"""
+
+
+def run_python(code):
+    """Returns (wall seconds, stdout) of running code in a fresh interpreter"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return time.perf_counter() - start, result.stdout
+
+
+def import_ms(module, runs, baseline):
+    best = min(run_python(f"import {module}")[0] for _ in range(runs))
+    return 1000 * (best - baseline)
+
+
+def first_frame_ms(use_loader, runs):
+    """(ms to the first frame, ms to the first frame with fish), best of runs"""
+    code = FIRST_FRAME_CODE.format(use_loader=use_loader)
+    times = [
+        [float(line) for line in run_python(code)[1].strip().splitlines()[-2:]]
+        for _ in range(runs)
+    ]
+    return tuple(min(column) for column in zip(*times))
+
+
+def run(runs=DEFAULT_RUNS, verbose=True):
+    """
+    Returns {"import": {module: ms}, "first_frame": {mode: ms},
+    "first_fish": {mode: ms}, "over": [...]}
+    """
+    baseline = min(run_python("pass")[0] for _ in range(runs))
+    first = {
+        mode: first_frame_ms(mode == "loader", runs) for mode in FIRST_FRAME_BUDGET_MS
+    }
+    results = {
+        "import": {
+            module: import_ms(module, runs, baseline) for module in IMPORT_BUDGET_MS
+        },
+        "first_frame": {mode: ms for mode, (ms, _) in first.items()},
+        "first_fish": {mode: ms for mode, (_, ms) in first.items()},
+    }
+    over = []
+    for kind, budgets in (
+        ("import", IMPORT_BUDGET_MS),
+        ("first_frame", FIRST_FRAME_BUDGET_MS),
+        ("first_fish", FIRST_FISH_BUDGET_MS),
+    ):
+        for name, budget in budgets.items():
+            ms = results[kind][name]
+            if ms > budget:
+                over.append(f"{kind} {name}")
+            if verbose:
+                flag = "  OVER BUDGET" if ms > budget else ""
+                label = f"{kind.replace('_', ' ')} {name}"
+                print(f"{label:34s} {ms:7.1f} ms  (budget {budget}){flag}")
+    results["over"] = over
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args()
+    results = run(args.runs)
+    sys.exit(1 if results["over"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Fixed-capacity bubble particle pool.
+
+Every bubble used to be a Bubble sprite with its own freshly allocated SRCALPHA
+surface, joining and leaving sprite groups as it was born and killed. When many
+fish bubble at once that churns allocations and group membership.
+
+BubblePool keeps position, velocity, start position and radius of up to
+capacity bubbles in NumPy arrays, moves and retires them all in one vectorised
+update, and draws them from images shared by every bubble with the same
+(radius, colour, linewidth). capacity is a global particle budget: emissions
+beyond it are dropped (and counted in self.dropped). limit can lower that
+budget on the fly (see quality_governor); bubbles already out are left to
+rise.
+"""
+
+from functools import lru_cache
+import numpy as np
+import pygame as pg
+
+MAX_BUBBLES = 2000
+
+DEFAULT_PARAMS = {
+    "radius_min_max": (3, 5),
+    "size_scale_factor": 1.0,
+    "colour": "white",
+    "linewidth": 1,
+    "speed_scale_factor": 1.0,
+    "travel_distance": 100,
+}
+
+
+@lru_cache(maxsize=None)
+def bubble_image(radius, colour, linewidth):
+    image = pg.Surface((2 * radius, 2 * radius), pg.SRCALPHA)
+    pg.draw.circle(image, colour, (radius, radius), radius, linewidth)
+    return image
+
+
+class BubblePool:
+    def __init__(self, capacity=MAX_BUBBLES, rng=None, **kwargs):
+        params = DEFAULT_PARAMS.copy()
+        params.update({k: v for k, v in kwargs.items() if v is not None})
+        self.__dict__.update(params)
+        self.capacity = capacity
+        self.limit = capacity  # live bubbles allowed, at most capacity
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2))  # before the last update
+        self.alpha = 1.0  # draw this fraction of the way from prev_pos to pos
+        self.vel = np.zeros((capacity, 2))
+        self.start_pos = np.zeros((capacity, 2))
+        self.radius = np.zeros(capacity, dtype=np.int64)
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.dropped = 0
+        lo, hi = self.radius_min_max
+        self.images = {
+            r: bubble_image(r, self.colour, self.linewidth) for r in range(lo, hi + 1)
+        }
+
+    def __len__(self):
+        return self.capacity - len(self.free_slots)
+
+    def emit(self, positions):
+        """Adds a bubble at each (x, y) in positions, budget permitting"""
+        n = min(len(positions), len(self.free_slots), max(0, self.limit - len(self)))
+        self.dropped += len(positions) - n
+        if not n:
+            return
+        idx = [self.free_slots.pop() for _ in range(n)]
+        radius = self.rng.integers(
+            self.radius_min_max[0], self.radius_min_max[1] + 1, n
+        )
+        self.alive[idx] = True
+        self.pos[idx] = positions[:n]
+        self.prev_pos[idx] = positions[:n]
+        self.start_pos[idx] = positions[:n]
+        self.radius[idx] = radius
+        self.vel[idx, 0] = 0
+        self.vel[idx, 1] = -self.size_scale_factor * 20 * np.sqrt(radius)
+
+    def update(self, dt):
+        alive = self.alive
+        self.prev_pos[:] = self.pos
+        self.pos[alive] += self.vel[alive] * dt
+        travelled = np.hypot(*(self.pos - self.start_pos).T)
+        retire = alive & (
+            (self.pos[:, 1] < -self.radius) | (travelled > self.travel_distance)
+        )
+        if retire.any():
+            alive[retire] = False
+            self.free_slots.extend(np.flatnonzero(retire).tolist())
+
+    def draw_sequence(self):
+        """
+        Returns [(image, (x, y, w, h)), ...] for every live bubble, alpha of the
+        way from its previous to its current position
+        """
+        idx = np.flatnonzero(self.alive)
+        radius = self.radius[idx]
+        pos = self.pos[idx]
+        if self.alpha != 1:
+            prev_pos = self.prev_pos[idx]
+            pos = prev_pos + self.alpha * (pos - prev_pos)
+        # as rect.center = pos, which truncates
+        topleft = pos.astype(np.int64) - radius[:, None]
+        images = self.images
+        return [
+            (images[r], (x, y, 2 * r, 2 * r))
+            for r, (x, y) in zip(radius.tolist(), topleft.tolist())
+        ]
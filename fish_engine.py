@@ -0,0 +1,347 @@
+"""
+Structure-of-arrays kinematics engine for the fish in kiss_fish_ai_animated.
+
+Fish.update does its seek/wander steering, state changes, speed clamping, angle
+clamping and wall wrapping one Vector2 at a time, so frame time grows in slow
+Python per fish. FishEngine keeps the same quantities for the whole population
+in contiguous NumPy arrays (one slot per fish) and advances every fish with one
+vectorised step. The sprites then only need to read back their slot to draw.
+
+The maths in step() mirrors Fish.update line for line, so a fish gives the same
+motion whichever path drives it.
+
+Slots are recycled: remove() marks a slot dead and puts it on a free list, add()
+reuses free slots before growing the arrays (capacity doubles when full).
+
+Fish only interact in update_interactions: predators and prey (see predation)
+and schooling (see schooling) each bin the fish themselves every step.
+"""
+
+import numpy as np
+from predation import predator_prey_steer
+from schooling import school_steer
+from vectors import lengths, truncate, TINY
+
+STATES = ("hover", "swim", "dart")
+STATE_INDEX = {state: i for i, state in enumerate(STATES)}
+HOVER, SWIM, DART = range(len(STATES))
+
+# per-fish scalar parameters copied from Fish params into arrays
+SCALAR_PARAMS = (
+    "hover_frame_update_interval",
+    "swim_dart_frame_update_distance",
+    "max_force",
+    "min_state_duration",
+    "max_state_duration",
+    "acceleration_duration",
+    "prob_swim",
+    "prob_hover",
+    "prob_dart",
+    "prob_chomp",
+    "rand_target_time",
+    "wander_ring_distance",
+    "wander_ring_radius",
+    "sense_radius",
+    "flee_radius",
+    "pursue_force",
+    "flee_force",
+    "school_cell_size",
+    "separation_cell_size",
+    "separation_weight",
+    "alignment_weight",
+    "cohesion_weight",
+    "school_force",
+)
+
+# every per-fish array: (name, shape per fish, dtype, initial value)
+ARRAYS = (
+    ("alive", (), bool, False),
+    ("pos", (2,), np.float64, 0),
+    ("prev_pos", (2,), np.float64, 0),  # before the last step, for interpolation
+    ("vel", (2,), np.float64, 1),  # non-zero so dead slots never divide by 0
+    ("acc", (2,), np.float64, 0),
+    ("interaction", (2,), np.float64, 0),  # pursuit / flight steer this step
+    ("school", (2,), np.float64, 0),  # schooling steer this step
+    ("target", (2,), np.float64, 0),
+    ("half_size", (2,), np.float64, 0),
+    ("min_speed", (len(STATES),), np.float64, 0),
+    ("max_speed", (len(STATES),), np.float64, 0),
+    ("tan_max_angle", (), np.float64, 0),
+    *((name, (), np.float64, 0) for name in SCALAR_PARAMS),
+    ("predator", (), bool, False),
+    ("schooling", (), bool, False),
+    ("species", (), np.int64, 0),
+    ("state", (), np.int8, SWIM),
+    ("chomp", (), bool, False),
+    ("transitioning", (), bool, False),
+    ("old_speed", (), np.float64, 0),
+    ("new_speed", (), np.float64, 0),
+    ("duration_of_current_state", (), np.float64, 0),
+    ("time_of_last_state_change", (), np.float64, 0),
+    ("last_update", (), np.float64, 0),
+    ("anim_phase", (), np.float64, 0),
+)
+
+
+class FishEngine:
+    """
+    Batched kinematics and state machine for a population of fish.
+    Arrays are indexed by slot; only slots with alive[slot] True are fish.
+    """
+
+    def __init__(self, width, height, capacity=64, rng=None):
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.capacity = 0
+        self.free_slots = []
+        self.num_alive = 0
+        self._allocate(capacity)
+
+    def _new_array(self, name, shape, dtype, fill):
+        """Storage for one per-fish array (see sharded_engine for shared memory)"""
+        return np.full(shape, fill, dtype=dtype)
+
+    def _allocate(self, capacity):
+        """Grows all arrays to capacity, preserving existing slots."""
+        old = self.capacity
+        for name, shape, dtype, fill in ARRAYS:
+            arr = self._new_array(name, (capacity, *shape), dtype, fill)
+            if old:
+                arr[:old] = getattr(self, name)
+            setattr(self, name, arr)
+        self.free_slots.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def add(self, params, pos, vel, target, half_size, now, anim_phase=0):
+        """
+        Adds a fish and returns its slot index.
+        params is the merged Fish params dict (Fish.DEFAULT_PARAMS + overrides).
+        anim_phase is the starting animation cursor (see _advance_animation).
+        """
+        if not self.free_slots:
+            self._allocate(2 * self.capacity)
+        i = self.free_slots.pop()
+        self.alive[i] = True
+        self.pos[i] = pos
+        self.prev_pos[i] = pos
+        self.vel[i] = vel
+        self.acc[i] = 0
+        self.interaction[i] = 0
+        self.school[i] = 0
+        self.target[i] = target
+        self.half_size[i] = half_size
+        self.min_speed[i] = [params["min_speed_" + state] for state in STATES]
+        self.max_speed[i] = [params["max_speed_" + state] for state in STATES]
+        self.tan_max_angle[i] = np.tan(np.radians(params["max_angle_with_horizontal"]))
+        for name in SCALAR_PARAMS:
+            getattr(self, name)[i] = params[name]
+        self.predator[i] = params["predator"]
+        self.schooling[i] = params["schooling"]
+        self.species[i] = params["species"]
+        self.state[i] = SWIM
+        self.chomp[i] = False
+        self.transitioning[i] = False
+        self.duration_of_current_state[i] = self.rng.integers(
+            int(params["min_state_duration"]), int(params["max_state_duration"]) + 1
+        )
+        self.time_of_last_state_change[i] = now
+        self.last_update[i] = 0
+        self.anim_phase[i] = anim_phase
+        self.num_alive += 1
+        return i
+
+    def close(self):
+        """Releases anything held outside the process (nothing, here)"""
+
+    def remove(self, i):
+        if self.alive[i]:
+            self.alive[i] = False
+            self.vel[i] = 1
+            self.free_slots.append(i)
+            self.num_alive -= 1
+
+    def _update_states(self, now):
+        due = (
+            self.alive
+            & ~self.transitioning
+            & (now - self.time_of_last_state_change > self.duration_of_current_state)
+        )
+        idx = np.flatnonzero(due)
+        n = len(idx)
+        if not n:
+            return
+        rng = self.rng
+        self.chomp[idx] = rng.random(n) < self.prob_chomp[idx]
+        lo = self.min_state_duration[idx].astype(np.int64)
+        hi = self.max_state_duration[idx].astype(np.int64)
+        duration = rng.integers(np.minimum(lo, hi), np.maximum(lo, hi) + 1).astype(
+            np.float64
+        )
+        self.time_of_last_state_change[idx] = now
+        # darts always revert to swim, otherwise choose weighted by probs
+        weights = np.stack(
+            (self.prob_swim[idx], self.prob_hover[idx], self.prob_dart[idx]), axis=1
+        )
+        cum = np.cumsum(weights, axis=1)
+        r = rng.random(n) * cum[:, -1]
+        choice = (r[:, None] >= cum).sum(axis=1).clip(0, 2)
+        new_state = np.array((SWIM, HOVER, DART), dtype=np.int8)[choice]
+        new_state[self.state[idx] == DART] = SWIM
+        self.state[idx] = new_state
+        duration[new_state == DART] *= 0.4  # darts are shorter duration
+        self.duration_of_current_state[idx] = duration
+        self.old_speed[idx] = lengths(self.vel[idx])
+        lo = self.min_speed[idx, new_state]
+        hi = self.max_speed[idx, new_state]
+        self.new_speed[idx] = lo + (hi - lo) * rng.random(n)
+        self.transitioning[idx] = True
+
+    def _wander(self, now):
+        """Refreshes wander targets that are due and returns the seek steer."""
+        refresh = self.alive & (now - self.last_update > self.rand_target_time)
+        idx = np.flatnonzero(refresh)
+        if len(idx):
+            self.last_update[idx] = now
+            vel = self.vel[idx]
+            heading = vel / np.maximum(lengths(vel), TINY)[:, None]
+            future = self.pos[idx] + heading * self.wander_ring_distance[idx, None]
+            angle = self.rng.uniform(0, 2 * np.pi, len(idx))
+            ring = self.wander_ring_radius[idx, None] * np.stack(
+                (np.cos(angle), np.sin(angle)), axis=1
+            )
+            self.target[idx] = future + ring
+        return self.seek(self.target)
+
+    def seek(self, target):
+        """Vectorised Fish.seek for every slot."""
+        rows = np.arange(self.capacity)
+        offset = target - self.pos
+        dist = np.maximum(lengths(offset), TINY)
+        desired = offset * (self.max_speed[rows, self.state] / dist)[:, None]
+        return truncate(desired - self.vel, self.max_force)
+
+    def update_interactions(self):
+        """
+        Sets interaction to every fish's pursuit or flight steer (see
+        predation), and school to its schooling steer (see schooling)
+        """
+        self.interaction[:] = 0
+        self.school[:] = 0
+        rows = np.arange(self.capacity)
+        max_speed = self.max_speed[rows, self.state]
+        if (self.alive & self.predator).any():
+            alive = np.flatnonzero(self.alive)
+            self.interaction[alive] = predator_prey_steer(
+                self.pos[alive],
+                self.vel[alive],
+                self.predator[alive],
+                self.sense_radius[alive],
+                self.flee_radius[alive],
+                max_speed[alive],
+                self.pursue_force[alive],
+                self.flee_force[alive],
+            )
+        flock = np.flatnonzero(self.alive & self.schooling)
+        if len(flock):
+            self.school[:] = school_steer(
+                flock,
+                self.pos,
+                self.vel,
+                self.species,
+                self.school_cell_size[flock].max(),
+                self.separation_cell_size[flock].max(),
+                max_speed,
+                self.school_force,
+                self.separation_weight,
+                self.alignment_weight,
+                self.cohesion_weight,
+            )
+
+    def step(self, dt, now):
+        """
+        Advances every live fish by dt seconds.
+        now is the simulation time in ms (see sim_clock.SimClock).
+        """
+        self.update_interactions()
+        self._update_states(now)
+        rows = np.arange(self.capacity)
+        state = self.state
+        # wander and schooling share the max-force clamp (school_force for
+        # schooling fish); pursuit and flight have their own
+        force = np.where(self.schooling, self.school_force, self.max_force)
+        self.acc[:] = truncate(self._wander(now) + self.school, force)
+        self.acc += self.interaction
+        vel = self.vel
+        vel += self.acc * dt
+        speed = lengths(vel)
+
+        # ease speed towards new_speed after a state change
+        trans = np.flatnonzero(self.transitioning & self.alive)
+        if len(trans):
+            frac = (now - self.time_of_last_state_change[trans]) / (
+                self.acceleration_duration[trans]
+            )
+            easing_frac = 3 * frac * frac - 2 * frac * frac * frac
+            old_speed = self.old_speed[trans]
+            speed[trans] = old_speed + (self.new_speed[trans] - old_speed) * easing_frac
+            self.transitioning[trans[frac >= 1]] = False
+
+        # speed limits (both tested against the same pre-clamp speed, as in Fish)
+        max_speed = self.max_speed[rows, state]
+        min_speed = self.min_speed[rows, state]
+        self._advance_animation(dt, speed)
+        new_speed = np.where(
+            ~self.transitioning & (speed > max_speed), max_speed, speed
+        )
+        new_speed = np.where(speed < min_speed, min_speed, new_speed)
+        old_len = np.maximum(lengths(vel), TINY)
+        vel *= (new_speed / old_len)[:, None]
+
+        # clamp angle to horizontal
+        max_vy = np.abs(vel[:, 0]) * self.tan_max_angle
+        vel[:, 1] = np.where(
+            np.abs(vel[:, 1]) > max_vy, np.copysign(max_vy, vel[:, 1]), vel[:, 1]
+        )
+
+        pos = self.pos
+        self.prev_pos[:] = pos
+        pos += vel * dt
+        self._wrap()
+
+    def interpolated_pos(self, alpha):
+        """
+        Positions alpha of the way from before the last step to now, for drawing
+        between fixed steps. A fish that wrapped is moved the short way round,
+        off the edge it left by, rather than back across the screen.
+        """
+        period = np.array([self.width, self.height]) + 2 * self.half_size
+        delta = self.pos - self.prev_pos
+        delta -= period * np.round(delta / period)
+        return self.prev_pos + alpha * delta
+
+    def _wrap(self):
+        pos = self.pos
+        hw = self.half_size[:, 0]
+        hh = self.half_size[:, 1]
+        x, y = pos[:, 0], pos[:, 1]
+        x[:] = np.where(x < -hw, self.width + hw, np.where(x > self.width + hw, -hw, x))
+        y[:] = np.where(
+            y < -hh, self.height + hh, np.where(y > self.height + hh, -hh, y)
+        )
+
+    def _advance_animation(self, dt, speed):
+        """
+        Advances every fish's animation cursor; the frame shown is
+        frames[int(anim_phase) % len(frames)]. Hovering fish animate with time,
+        swimming and darting fish with distance swum.
+        """
+        alive = self.alive
+        hovering = alive & (self.state == HOVER)
+        moving = alive & ~hovering
+        self.anim_phase[hovering] += (
+            1000 * dt / self.hover_frame_update_interval[hovering]
+        )
+        self.anim_phase[moving] += (
+            speed[moving] * dt / self.swim_dart_frame_update_distance[moving]
+        )
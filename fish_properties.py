@@ -185,5 +185,9 @@ fish_properties = {
         "rand_target_time": (150, 250),
         "wander_ring_distance": (300, 500),
         "wander_ring_radius": (30, 70),
+        # predators and prey
+        "predator": True,
+        "sense_radius": (150, 250),  # pix
+        "pursue_force": (20, 40),
     },
 }
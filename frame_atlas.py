@@ -0,0 +1,94 @@
+"""
+Render-ready animation frames cut from one display-format atlas per spritesheet.
+
+get_frames builds every frame as its own plain SRCALPHA surface, so each frame
+owns a pixel buffer and every blit converts pixel formats on the fly. A
+FrameAtlas packs the frames of a spritesheet (without the sheet's padding) into
+one surface, converts it to the display format once
+(convert_alpha) and hands out frames in one of two modes,
+
+    "subsurface"  frames are subsurfaces of the atlas: no per-frame pixel
+                  buffers at all, and blits need no format conversion
+    "rle"         frames are cut out of the atlas and RLE accelerated: fully
+                  transparent runs are skipped when blitting, which is several
+                  times faster for sprites that are mostly transparent
+
+The atlas also keeps the packed rect of every frame, for renderers that blit the
+atlas with an area rect (screen.blit(atlas.surface, pos, area)) instead.
+
+convert_alpha needs a display mode; without one (e.g. headless runs) the atlas
+is left in the sheet's own format.
+bench_blits.py compares blit throughput of the modes with plain frames.
+"""
+
+import pygame as pg
+
+ATLAS_MODES = ("subsurface", "rle")
+
+
+def to_display_format(surface):
+    """convert_alpha if a display mode is set, else a plain copy"""
+    if pg.display.get_surface() is None:
+        return surface.copy()
+    return surface.convert_alpha()
+
+
+class FrameAtlas:
+    """
+    The frames of one spritesheet packed into a display-format surface.
+    frame_rects is the sheet's {key: [(x, y, w, h), ...]} table as in
+    spritesheet_reader.get_frame_rects (or any subset of it); self.frame_rects
+    maps the same keys to the frames' rects in the packed atlas.
+    With convert=False the packed atlas is left unconverted until convert() is
+    called, so packing can run on a loader thread and converting on the main
+    thread (see frame_provider).
+    """
+
+    def __init__(self, sheet, frame_rects, mode="subsurface", convert=True):
+        if mode not in ATLAS_MODES:
+            raise ValueError(f"mode must be one of {ATLAS_MODES}, not {mode!r}")
+        self.mode = mode
+        # shelf packing: frames left to right in shelves as wide as the longest
+        # key's row of frames
+        width = max(
+            (sum(r[2] for r in rects) for rects in frame_rects.values()), default=0
+        )
+        self.frame_rects = {}
+        x = y = shelf_height = 0
+        for key, rects in frame_rects.items():
+            packed = []
+            for _, _, w, h in rects:
+                if x + w > width:
+                    x, y, shelf_height = 0, y + shelf_height, 0
+                packed.append(pg.Rect(x, y, w, h))
+                x += w
+                shelf_height = max(shelf_height, h)
+            self.frame_rects[key] = tuple(packed)
+        height = y + shelf_height
+        atlas = pg.Surface((max(width, 1), max(height, 1)), pg.SRCALPHA)
+        for key, rects in frame_rects.items():
+            for src, dst in zip(rects, self.frame_rects[key]):
+                # max with fully transparent zeros copies pixels exactly
+                atlas.blit(sheet, dst, src, special_flags=pg.BLEND_RGBA_MAX)
+        self.surface = atlas
+        self.converted = False
+        if convert:
+            self.convert()
+
+    def convert(self):
+        """Converts the atlas to the display format, once"""
+        if not self.converted:
+            self.surface = to_display_format(self.surface)
+            self.converted = True
+
+    def get_frames(self, key):
+        """Returns tuple of frame surfaces for key"""
+        rects = self.frame_rects[key]
+        if self.mode == "subsurface":
+            return tuple(self.surface.subsurface(rect) for rect in rects)
+        frames = []
+        for rect in rects:
+            frame = self.surface.subsurface(rect).copy()
+            frame.set_alpha(255, pg.RLEACCEL)
+            frames.append(frame)
+        return tuple(frames)
@@ -0,0 +1,135 @@
+"""
+Persistent cache of decoded spritesheet pixels for spritesheet_reader.get_frames.
+
+Decoding the PNG spritesheets dominates start-up time, especially for the HALF
+and FULL sizes. The first time a sheet is loaded its decoded RGBA pixels are
+written to CACHE_DIR as a raw .rgba file, alongside a .json file holding the
+sheet size, the frame-rect table and the source PNG's sha1 and mtime.
+
+On later starts the raw file is memory-mapped and frames are cut straight out of
+the mapped rows with no PNG decode. Only the rows that are actually turned into
+frames are ever read from disk.
+
+A cache entry is reused while the PNG's mtime and size match; if they differ the
+PNG is re-hashed and the entry is rebuilt only if the hash has changed too.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pygame as pg
+
+CACHE_DIR = ".frame_cache"
+CACHE_VERSION = 1
+
+
+def file_hash(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def cache_paths(png_path, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(png_path))[0]
+    base = os.path.join(cache_dir, stem)
+    return base + ".rgba", base + ".json"
+
+
+class CachedSheet:
+    """
+    Decoded RGBA pixels of one spritesheet, memory-mapped from the cache,
+    plus its frame-rect table {key: [(x, y, w, h), ...]}.
+    """
+
+    def __init__(self, raw_path, size, frame_rects):
+        self.size = size
+        self.frame_rects = frame_rects
+        w, h = size
+        self.pixels = np.memmap(raw_path, dtype=np.uint8, mode="r", shape=(h, w, 4))
+
+    def band(self, y, height):
+        """Surface over rows y to y + height of the sheet (no copy)"""
+        return pg.image.frombuffer(
+            self.pixels[y : y + height], (self.size[0], height), "RGBA"
+        )
+
+    def get_frames(self, key):
+        """Returns list of frame surfaces for key, copied out of the mapped rows"""
+        rects = self.frame_rects[key]
+        if not rects:
+            return []
+        top = min(y for x, y, w, h in rects)
+        bottom = max(y + h for x, y, w, h in rects)
+        band = self.band(top, bottom - top)
+        return [band.subsurface((x, y - top, w, h)).copy() for x, y, w, h in rects]
+
+
+def _entry_is_valid(png_path, raw_path, meta):
+    if meta.get("version") != CACHE_VERSION or not os.path.exists(raw_path):
+        return False
+    w, h = meta["size"]
+    if os.path.getsize(raw_path) != w * h * 4:
+        return False
+    stat = os.stat(png_path)
+    if meta["mtime"] == stat.st_mtime and meta["bytes"] == stat.st_size:
+        return True
+    return meta["sha1"] == file_hash(png_path)
+
+
+def _write_meta(meta_path, meta):
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def build_entry(png_path, frame_rects, cache_dir=CACHE_DIR):
+    """Decodes png_path and writes its cache entry. Returns the meta dict."""
+    raw_path, meta_path = cache_paths(png_path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    sheet = pg.image.load(png_path)
+    # write to temporary files then rename, so a crash never leaves a bad entry
+    with open(raw_path + ".tmp", "wb") as f:
+        f.write(pg.image.tobytes(sheet, "RGBA"))
+    stat = os.stat(png_path)
+    meta = {
+        "version": CACHE_VERSION,
+        "source": png_path,
+        "sha1": file_hash(png_path),
+        "mtime": stat.st_mtime,
+        "bytes": stat.st_size,
+        "size": list(sheet.get_size()),
+        "frame_rects": frame_rects,
+    }
+    os.replace(raw_path + ".tmp", raw_path)
+    _write_meta(meta_path, meta)
+    return meta
+
+
+def load_sheet(png_path, frame_rects, cache_dir=CACHE_DIR, verbose=False):
+    """
+    Returns a CachedSheet for png_path, building or refreshing the cache entry
+    if needed. frame_rects is the sheet's {key: [(x, y, w, h), ...]} table.
+    """
+    raw_path, meta_path = cache_paths(png_path, cache_dir)
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if not _entry_is_valid(png_path, raw_path, meta):
+            meta = None
+    if meta is None:
+        if verbose:
+            print(f"  building frame cache for {png_path}")
+        meta = build_entry(png_path, frame_rects, cache_dir)
+    else:
+        stat = os.stat(png_path)
+        table = json.loads(json.dumps(frame_rects))
+        touched = (meta["mtime"], meta["bytes"]) != (stat.st_mtime, stat.st_size)
+        if touched or meta["frame_rects"] != table:
+            # same pixels but touched file or new rect table: refresh the meta only
+            meta.update(mtime=stat.st_mtime, bytes=stat.st_size, frame_rects=table)
+            _write_meta(meta_path, meta)
+    return CachedSheet(raw_path, tuple(meta["size"]), frame_rects)
@@ -0,0 +1,192 @@
+"""
+Lazy, demand-driven animation frames by fish type, colour and state.
+
+get_frames builds every frame of all 6 fish types x 6 colours x 3 states x 2
+directions up front, but a tank usually holds only a few species. FrameProvider
+cuts a (type, colour, state) set (both directions) out of the memory-mapped frame
+cache the first time one of its keys is asked for, so start-up time and resident
+memory scale with what is actually in the tank.
+
+It is indexed with the same keys as the get_frames dict,
+
+    key = fish_num + "_" + colour + "_" + state + "_" + direction
+
+so it can be passed anywhere that dict is used (e.g. get_species_frames).
+With atlas "subsurface" or "rle" frames are render-ready, cut from a
+display-format FrameAtlas of just that set's frames (see frame_atlas). In "rle"
+mode the atlas is dropped once the frames are cut.
+Decoded sets are kept in an LRU cache of at most max_sets entries; evicting a set
+only drops the provider's reference, fish already holding its frames keep them.
+
+Sets may be prepared from several threads at once (see asset_loader): each
+fish type's sheet is loaded and packed under its own lock, so different types
+decode in parallel and no sheet is loaded twice. The LRU and pending sets are
+shared by all types, so they are only touched under one provider-wide lock.
+Converting to the display format needs the main thread, so prepare() leaves
+atlases unconverted and get_set converts them.
+"""
+
+import threading
+from collections import OrderedDict
+from spritesheet_reader import (
+    COLOURS,
+    DIRECTIONS,
+    get_frame_rects,
+    get_spritesheet_path,
+)
+from frame_cache import load_sheet
+from frame_atlas import FrameAtlas
+
+DEFAULT_MAX_SETS = 36
+
+
+class FrameProvider:
+    def __init__(self, size, max_sets=DEFAULT_MAX_SETS, verbose=False, atlas=None):
+        self.size = size.upper()
+        self.max_sets = max_sets
+        self.verbose = verbose
+        self.atlas = atlas
+        self.sheets = {}  # fish_num -> CachedSheet (memory-mapped, cheap to keep)
+        # (fish_num, colour, state) -> what prepare() made, waiting for get_set:
+        # an unconverted FrameAtlas, or {key: frames} without an atlas
+        self.pending = {}
+        self.sets = OrderedDict()  # (fish_num, colour, state) -> {key: frames}
+        self.locks = {}  # fish_num -> RLock, held while decoding that type
+        self.cache_lock = threading.Lock()  # guards pending, sets, locks, hits, misses
+        self.hits = 0
+        self.misses = 0
+
+    def _sheet(self, fish_num):
+        if fish_num not in self.sheets:
+            self.sheets[fish_num] = load_sheet(
+                get_spritesheet_path(self.size, fish_num),
+                get_frame_rects(self.size, fish_num),
+                verbose=self.verbose,
+            )
+        return self.sheets[fish_num]
+
+    def _set_rects(self, fish_num, colour, state):
+        """{key: frame rects} of both directions of one state"""
+        frame_rects = self._sheet(fish_num).frame_rects
+        rects = {}
+        for direction in DIRECTIONS:
+            key = fish_num + "_" + colour + "_" + state + "_" + direction
+            if key not in frame_rects:
+                raise KeyError(key)
+            rects[key] = frame_rects[key]
+        return rects
+
+    def _pack(self, fish_num, colour, state):
+        """Unconverted FrameAtlas of one set, from only the sheet rows it is on"""
+        if self.verbose:
+            print(f"packing frames {fish_num} {colour} {state}")
+        rects = self._set_rects(fish_num, colour, state)
+        all_rects = [rect for key_rects in rects.values() for rect in key_rects]
+        top = min((y for x, y, w, h in all_rects), default=0)
+        bottom = max((y + h for x, y, w, h in all_rects), default=1)
+        band = self._sheet(fish_num).band(top, bottom - top)
+        rects = {
+            key: [(x, y - top, w, h) for x, y, w, h in key_rects]
+            for key, key_rects in rects.items()
+        }
+        return FrameAtlas(band, rects, self.atlas, convert=False)
+
+    def _lock(self, fish_num):
+        with self.cache_lock:
+            return self.locks.setdefault(fish_num, threading.RLock())
+
+    def get_set(self, fish_num, colour, state):
+        """Returns {key: frame tuple} for both directions of one state"""
+        set_key = (fish_num, colour, state)
+        with self.cache_lock:
+            frames = self.sets.get(set_key)
+            if frames is not None:
+                self.hits += 1
+                self.sets.move_to_end(set_key)
+                return frames
+            self.misses += 1
+        with self._lock(fish_num):
+            with self.cache_lock:
+                # another thread may have made it while we waited for the lock
+                frames = self.sets.get(set_key)
+                pending = self.pending.pop(set_key, None)
+            if frames is None:
+                frames = self._finish(fish_num, colour, state, pending)
+                with self.cache_lock:
+                    self.sets[set_key] = frames
+                    if self.max_sets is not None and len(self.sets) > self.max_sets:
+                        self.sets.popitem(last=False)
+        return frames
+
+    def _cut(self, fish_num, colour, state):
+        """Decodes a set's frames straight from the sheet (no atlas)"""
+        if self.verbose:
+            print(f"decoding frames {fish_num} {colour} {state}")
+        sheet = self._sheet(fish_num)
+        return {
+            key: tuple(sheet.get_frames(key))
+            for key in self._set_rects(fish_num, colour, state)
+        }
+
+    def _finish(self, fish_num, colour, state, pending):
+        """
+        Frames of a set from what prepare() left pending for it (None if
+        nothing), doing whatever decoding and converting is still to do.
+        """
+        if pending is None:
+            if self.atlas is None:
+                return self._cut(fish_num, colour, state)
+            pending = self._pack(fish_num, colour, state)
+        if self.atlas is None:
+            return pending
+        atlas = pending
+        atlas.convert()
+        return {key: atlas.get_frames(key) for key in atlas.frame_rects}
+
+    def __getitem__(self, key):
+        fish_num, colour, state, direction = key.split("_")
+        return self.get_set(fish_num, colour, state)[key]
+
+    def __contains__(self, key):
+        fish_num, colour, state, direction = key.split("_")
+        with self._lock(fish_num):
+            return key in self._sheet(fish_num).frame_rects
+
+    def prepare(self, fish_num, colour, states):
+        """
+        Does what decoding of sets can be done off the main thread: loads the
+        sheet and, in atlas mode, packs each set's atlas unconverted for get_set
+        to convert and cut. Without an atlas the sets are cut right away.
+        Prepared sets are held as pending, outside the LRU, until their first
+        get_set, so preparing more than max_sets cannot evict any of them.
+        States the fish type has no frames for (e.g. swim-chomp) are skipped.
+        """
+        with self._lock(fish_num):
+            for state in states:
+                set_key = (fish_num, colour, state)
+                key = fish_num + "_" + colour + "_" + state + "_" + DIRECTIONS[0]
+                if key not in self._sheet(fish_num).frame_rects:
+                    continue
+                with self.cache_lock:
+                    if set_key in self.sets or set_key in self.pending:
+                        continue
+                if self.atlas is None:
+                    pending = self._cut(fish_num, colour, state)
+                else:
+                    pending = self._pack(fish_num, colour, state)
+                with self.cache_lock:
+                    self.pending[set_key] = pending
+
+    def prefetch(self, combos, states=("idle", "swim", "swim-chomp")):
+        """
+        Decodes the frames for (fish_num, colour) combos we know we will spawn.
+        States a fish type has no frames for (e.g. swim-chomp) are skipped.
+        """
+        for fish_num, colour in combos:
+            for state in states:
+                key = fish_num + "_" + colour + "_" + state + "_" + DIRECTIONS[0]
+                if key in self:
+                    self.get_set(fish_num, colour, state)
+
+    def prefetch_all(self):
+        self.prefetch((str(i), colour) for i in range(1, 7) for colour in COLOURS)
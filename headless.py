@@ -0,0 +1,153 @@
+"""
+Headless, fixed-step runner for the kiss_fish_ai_animated simulation.
+
+Runs fish and bubble updates flat out with no window (SDL dummy video driver)
+and a fixed dt, then reports how many simulation ticks per second the fish logic
+can actually manage. Used for sizing deployments and catching performance
+regressions.
+
+    python headless.py --fish 1000 --duration 30 --dt 0.0166667
+
+duration is simulated seconds, so the run is duration / dt ticks however long it
+takes in wall time.
+"""
+
+import os
+
+# must be set before the pygame display is initialised
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import time
+import numpy as np
+import pygame as pg
+import kiss_fish_ai_animated as aquarium
+
+
+def percentiles(samples, qs=(50, 90, 99)):
+    """Returns {"p50": ..., ...} of samples (in the samples' units)"""
+    return {f"p{q}": float(np.percentile(samples, q)) for q in qs}
+
+
+def run_headless(
+    num_fish=aquarium.MAX_NUM_FISH,
+    duration=10.0,
+    dt=1 / aquarium.FPS,
+    size="FIFTH",
+    use_engine=aquarium.USE_FISH_ENGINE,
+    workers=aquarium.ENGINE_WORKERS,
+    schooling=aquarium.SCHOOLING,
+    verbose=False,
+):
+    """
+    Simulates num_fish fish for duration simulated seconds in fixed steps of dt
+    and returns a dict of throughput and per-tick latency statistics.
+    Time is fully synthetic: the tank's SimClock starts at 0 and advances by
+    exactly dt per tick however long the tick takes, so state changes, wander
+    targets and bubble bursts follow simulated time.
+    With workers, the FishEngine step is sharded across that many processes.
+    With schooling, fish school with the others of their species.
+    """
+    screen = pg.Surface((aquarium.SCREEN_WIDTH, aquarium.SCREEN_HEIGHT))
+    tank = aquarium.Aquarium(
+        screen,
+        num_fish,
+        size,
+        use_engine,
+        scenery=False,
+        overlay=False,
+        engine_workers=workers,
+        schooling=schooling,
+    )
+    clock = tank.clock
+    num_ticks = max(1, int(round(duration / dt)))
+    tick_times = np.zeros(num_ticks)
+    fish_updates = 0
+    start = time.perf_counter()
+    for tick in range(num_ticks):
+        t0 = time.perf_counter()
+        clock.tick(dt)
+        tank.update()
+        fish_updates += len(tank.fish_sprites)
+        tick_times[tick] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+    stats = {
+        "num_fish": tank.num_fish,
+        "engine": tank.engine is not None,
+        "workers": workers if tank.engine is not None else 0,
+        "schooling": schooling,
+        "dt": dt,
+        "ticks": num_ticks,
+        "wall_time": elapsed,
+        "ticks_per_sec": num_ticks / elapsed,
+        "fish_updates_per_sec": fish_updates / elapsed,
+        "final_bubbles": len(tank.bubbles),
+        "tick_ms": {
+            "mean": 1000 * float(tick_times.mean()),
+            **{k: 1000 * v for k, v in percentiles(tick_times).items()},
+            "max": 1000 * float(tick_times.max()),
+        },
+    }
+    tank.close()
+    if verbose:
+        print_stats(stats)
+    return stats
+
+
+def print_stats(stats):
+    engine = "FishEngine" if stats["engine"] else "per-fish Fish.update"
+    if stats["workers"]:
+        engine += f" in {stats['workers']} worker processes"
+    if stats["schooling"]:
+        engine += ", schooling"
+    num_fish, ticks, dt = stats["num_fish"], stats["ticks"], stats["dt"]
+    print(f"{num_fish} fish ({engine}), {ticks} ticks of dt={dt:.4f}s")
+    print(f"  wall time         {stats['wall_time']:.2f} s")
+    print(f"  ticks/sec         {stats['ticks_per_sec']:.1f}")
+    print(f"  fish-updates/sec  {stats['fish_updates_per_sec']:.0f}")
+    tick_ms = stats["tick_ms"]
+    print(
+        "  tick latency ms   " + "  ".join(f"{k}={v:.3f}" for k, v in tick_ms.items())
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--fish", type=int, default=aquarium.MAX_NUM_FISH)
+    parser.add_argument("--duration", type=float, default=10.0, help="simulated s")
+    parser.add_argument("--dt", type=float, default=1 / aquarium.FPS, help="s")
+    parser.add_argument("--size", default="FIFTH", help="spritesheet size")
+    parser.add_argument(
+        "--per-fish",
+        action="store_true",
+        help="use per-fish Fish.update instead of FishEngine",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=aquarium.ENGINE_WORKERS,
+        help="shard the FishEngine step across this many processes (0: in-process)",
+    )
+    parser.add_argument(
+        "--school",
+        action="store_true",
+        default=aquarium.SCHOOLING,
+        help="fish school with the others of their species",
+    )
+    args = parser.parse_args()
+    run_headless(
+        num_fish=args.fish,
+        duration=args.duration,
+        dt=args.dt,
+        size=args.size,
+        use_engine=not args.per_fish,
+        workers=args.workers,
+        schooling=args.school,
+        verbose=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
+    pg.quit()
@@ -1,25 +1,69 @@
 import math
+from itertools import count
 import numpy as np
 import pygame as pg
-from random import random, randint, uniform, choice, choices
-from spritesheet_reader import get_frames
+from spritesheet_reader import COLOUR_INDEX, NUM_COLOURS, get_frames
+from frame_provider import FrameProvider
+from renderer import BatchRenderer, DirtyTiles, LayerGroup, submit
+from overlay import ScrollingOverlay
+from bubbles import BubblePool
+from scheduler import Scheduler
+from sim_random import SimRandom
+from sim_clock import SimClock
 from fish_properties import fish_properties
-import uuid
-from itertools import cycle
-from rotate_about_arb_origin import blit_rotate
-from pprint import pprint
+from fish_engine import FishEngine, STATES
+from scenery import Scenery, SEAGRASS_PATH, CORAL_PATH
+from asset_loader import AssetLoader
+from picking import Picker, hit_radius
+from predation import predator_prey_steer
+from schooling import school_steer
+from quality_governor import QualityGovernor
+from functools import partial
 
 vec = pg.math.Vector2
 
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
 FPS = 60
+# simulation steps per second, independent of FPS (interpolated in between);
+# None steps the simulation once per frame with the frame time
+SIM_RATE = 60
+# most simulation steps run per frame; after a longer hitch the rest is dropped
+MAX_SUBSTEPS = 5
 
 BACKGROUND_COLOUR = "black"
 BOUNCE_MARGIN = 100  # for handling walls
 
 MAX_NUM_FISH = 50
 
+# decode animation frames per species on demand rather than all up front
+LAZY_FRAMES = True
+
+# render-ready fish frames from a display-format atlas: "rle", "subsurface" or None
+# for plain SRCALPHA surfaces (see frame_atlas)
+FRAME_ATLAS = "rle"
+
+# drive fish kinematics with the batched FishEngine rather than per-fish Fish.update
+USE_FISH_ENGINE = True
+# split the FishEngine step across this many worker processes (see sharded_engine),
+# 0 to step it in-process
+ENGINE_WORKERS = 0
+# fish school with the others of their species (see schooling), except predators
+SCHOOLING = False
+
+# lower rendering quality in stages when frames run over budget, and raise it
+# again when there is headroom (see quality_governor)
+ADAPTIVE_QUALITY = True
+
+# redraw and update only the screen regions that changed (see Aquarium.draw_dirty)
+DIRTY_RECTS = False
+# foreground filter resolution, "full" or "half" (see overlay.ScrollingOverlay)
+OVERLAY_QUALITY = "full"
+# in dirty-rect mode the full-screen filter moves only every this many frames
+OVERLAY_INTERVAL = 10
+# in dirty-rect mode redraw the whole frame when more than this fraction is dirty
+FULL_REDRAW_FRACTION = 0.5
+
 # TODO make these type dependent
 MIN_MAX_NUM_PAIRS = {
     "1": (1, 4),
@@ -31,6 +75,23 @@ MIN_MAX_NUM_PAIRS = {
 }
 
 MAX_SELECTED_FISH = 2
+# confirm picks against the frame's pixels, not just the fish's hit circle
+PIXEL_PICKING = True
+
+# simulation speed range for the +/- keys (see sim_clock.SimClock.scale)
+MIN_TIME_SCALE = 0.125
+MAX_TIME_SCALE = 8
+
+# seed for the simulation's random numbers, None for a different tank every run
+SEED = None
+
+# fish numbers, for messages; unique within a run
+fish_numbers = count(1)
+
+# bubble bursts (all times in ms)
+BUBBLE_INTERVAL = (2000, 5000)  # between bursts, randint range
+BUBBLES_PER_BURST = (0, 9)  # randint range
+BUBBLE_SPACING = 200  # between bubbles in a burst
 
 SOME_COLOURS = {
     "beige": (245, 245, 220, 255),
@@ -100,45 +161,32 @@ def get_outline_image(img, colour="white", linewidth=1, sf=1.4):
     return pg.transform.rotozoom(outline_img, 0, sf)
 
 
-class Bubble(pg.sprite.Sprite):
-    DEFAULT_PARAMS = {
-        "radius_min_max": (3, 5),
-        "size_scale_factor": 1.0,
-        "colour": "white",
-        "linewidth": 1,
-        "speed_scale_factor": 1.0,
-        "travel_distance": 100,
-    }
+def frame_image(frames, state, modifier, has_chomp, facing_right, frame_index):
+    """
+    Returns the animation frame at frame_index (any int >= 0, wrapped to the
+    length of the sequence) for a fish in state facing left or right.
+    Confusingly, not all fish types have chomp frames, so we need to check if it
+    has_chomp before checking modifier flag.
+    """
+    direction = "right" if facing_right else "left"
+    if has_chomp and modifier == "chomp":
+        sequence = frames["chomp"][direction]
+    else:
+        sequence = frames[state][direction]
+    return sequence[frame_index % len(sequence)]
 
-    def __init__(self, sprite_group, pos, **kwargs):
-        pg.sprite.Sprite.__init__(self, sprite_group)
-        self.start_pos = vec(pos)
-        params = self.DEFAULT_PARAMS.copy()
-        filtered_params = {k: v for k, v in kwargs.items() if v is not None}
-        params.update(filtered_params)
-        self.__dict__.update(params)
-        self.radius = randint(*self.radius_min_max)
-        self.pos = vec(self.start_pos)
-        self.vel = vec(0, -self.size_scale_factor * 20 * self.radius ** 0.5)
-        self.image = pg.Surface((2 * self.radius, 2 * self.radius), pg.SRCALPHA)
-        pg.draw.circle(
-            self.image,
-            self.colour,
-            (self.radius, self.radius),
-            self.radius,
-            self.linewidth,
-        )
-        self.rect = self.image.get_rect(center=self.pos)
 
-    def update(self, dt):
-        self.pos += self.vel * dt
-        if (
-            self.pos.y < -self.radius
-            or (self.pos - self.start_pos).length() > self.travel_distance
-        ):
-            self.kill()
-        else:
-            self.rect.center = self.pos
+def animation_rate(
+    state, speed, hover_frame_update_interval, swim_dart_frame_update_distance
+):
+    """
+    Animation frames per second: hovering fish animate with elapsed time,
+    swimming and darting fish with distance swum. Integrating this over time
+    gives each fish's frame cursor directly.
+    """
+    if state == "hover":
+        return 1000 / hover_frame_update_interval
+    return speed / swim_dart_frame_update_distance
 
 
 class Fish(pg.sprite.Sprite):
@@ -168,18 +216,37 @@ class Fish(pg.sprite.Sprite):
         "rand_target_time": 200,
         "wander_ring_distance": 400,
         "wander_ring_radius": 50,
+        # predators and prey (see predation)
+        "predator": False,
+        "sense_radius": 200,  # pix, predators pursue prey this close
+        "flee_radius": 100,  # pix, prey flee predators this close
+        "pursue_force": 30,
+        "flee_force": 60,
+        # schooling with fish of the same species (see schooling)
+        "schooling": False,
+        "species": 0,  # see species_number
+        # neighbours are the fish of the same species in the 3 x 3 block of
+        # cells of this side around a fish: all of them within one cell size,
+        # and some as far as 2.8 cell sizes (see schooling)
+        "school_cell_size": 80,  # pix, neighbours for alignment and cohesion
+        "separation_cell_size": 30,  # pix, neighbours that push away
+        "separation_weight": 1.5,
+        "alignment_weight": 1.0,
+        "cohesion_weight": 1.0,
+        "school_force": 20,  # replaces max_force for schooling fish
     }
 
-    def __init__(self, screen, sprite_group, frames, id, **kwargs):
+    def __init__(self, screen, sprite_group, frames, id, rng, now=0, **kwargs):
         self.screen = screen
         pg.sprite.Sprite.__init__(self, sprite_group)
         self.frames = frames
         self.id = id
+        self.rng = rng
         params = self.DEFAULT_PARAMS.copy()
         filtered_params = {k: v for k, v in kwargs.items() if v is not None}
         params.update(filtered_params)
         self.__dict__.update(params)
-        self.pos = vec(randint(0, SCREEN_WIDTH), randint(0, SCREEN_HEIGHT))
+        self.pos = vec(rng.randint(0, SCREEN_WIDTH), rng.randint(0, SCREEN_HEIGHT))
         self.state = "swim"
         self.modifier = None
         self.min_speed = {
@@ -193,10 +260,16 @@ class Fish(pg.sprite.Sprite):
             "dart": self.max_speed_dart,
         }
         self.vel = vec(
-            uniform(self.min_speed[self.state], self.max_speed[self.state]), 0
-        ).rotate(uniform(0, 360))
-        image_left = next(self.frames[self.state]["left"])
-        image_right = next(self.frames[self.state]["right"])
+            rng.uniform(self.min_speed[self.state], self.max_speed[self.state]), 0
+        ).rotate(rng.angle())
+        # animation cursor; frame shown is frames[int(anim_phase) % num frames]
+        self.anim_phase = rng.uniform(0, len(self.frames[self.state]["left"]))
+        image_left = frame_image(
+            self.frames, self.state, None, False, False, int(self.anim_phase)
+        )
+        image_right = frame_image(
+            self.frames, self.state, None, False, True, int(self.anim_phase)
+        )
         # self.outline_image_left = get_outline_image(image_left)
         # self.outline_image_right = get_outline_image(image_right)
         if self.vel.x >= 0:
@@ -204,28 +277,43 @@ class Fish(pg.sprite.Sprite):
         else:
             self.image = image_left
         self.rect = self.image.get_rect()  # same size for left and right
+        # for picking, fixed: all frames of a fish type are the same size
+        self.radius = hit_radius(self.image)
         self.acc = vec(0, 0)
+        self.interaction = vec(0, 0)  # pursuit / flight steer, set by Aquarium
+        self.school = vec(0, 0)  # schooling steer, set by Aquarium
         self.rect.center = self.pos
+        self.prev_pos = vec(self.pos)
         self.last_update = 0
-        self.target = vec(randint(0, SCREEN_WIDTH), randint(0, SCREEN_HEIGHT))
-        self.duration_of_current_state = randint(
+        self.target = vec(rng.randint(0, SCREEN_WIDTH), rng.randint(0, SCREEN_HEIGHT))
+        self.duration_of_current_state = rng.randint(
             int(self.min_state_duration), int(self.max_state_duration)
         )
-        now = pg.time.get_ticks()
         self.time_of_last_state_change = now
-        self.time_of_last_bubble = now
-        self.bubbling = False
-        self.bubble_interval = randint(2000, 5000)
-        self.bubble_times = None
-        self.last_hover_frame_update = now
+        self.bubbling = False  # in the middle of a bubble burst
+        self.burst_random = None  # its species' burst timing, set by Aquarium
         self.transitioning = False
-        self.distance = 0  # total distance travelled
         self.selected = False
         self.selection_ring_radius = self.rect.w // 2 + 10
         # self.show_outline = False
         # print("\nIn Fish init:")
         # pprint(self.__dict__)
-        self.uuid = str(uuid.uuid4())[:8]
+        self.number = next(fish_numbers)
+
+    def set_frames(self, frames):
+        """Switches to another set of frames, e.g. of another sprite size"""
+        self.frames = frames
+        self.image = frame_image(
+            self.frames,
+            self.state,
+            self.modifier,
+            self.has_chomp,
+            self.vel.x >= 0,
+            int(self.anim_phase),
+        )
+        self.rect = self.image.get_rect(center=self.rect.center)
+        self.radius = hit_radius(self.image)
+        self.selection_ring_radius = self.rect.w // 2 + 10
 
     def seek(self, target):
         self.desired = (target - self.pos).normalize() * self.max_speed[
@@ -236,13 +324,12 @@ class Fish(pg.sprite.Sprite):
             steer.scale_to_length(self.max_force)
         return steer
 
-    def wander(self):
-        now = pg.time.get_ticks()
+    def wander(self, now):
         if now - self.last_update > self.rand_target_time:
             self.last_update = now
             future = self.pos + self.vel.normalize() * self.wander_ring_distance
             self.target = future + vec(self.wander_ring_radius, 0).rotate(
-                uniform(0, 360)
+                self.rng.angle()
             )
         return self.seek(self.target)
 
@@ -264,51 +351,48 @@ class Fish(pg.sprite.Sprite):
                 if not (-BOUNCE_MARGIN <= self.pos.y <= SCREEN_HEIGHT + BOUNCE_MARGIN):
                     self.vel.y = -self.vel.y
 
-    def update(self, dt):
-        """ dt is frame time step in seconds """
-        now = pg.time.get_ticks()
-
-        # bubbles
-        if now - self.time_of_last_bubble > self.bubble_interval:
-            self.bubbling = True
-            self.time_of_last_bubble = now
-            self.bubble_interval = randint(2000, 5000)
-
-        # state changes
-        if (
-            not self.transitioning
-            and now - self.time_of_last_state_change > self.duration_of_current_state
-        ):
-            # print("changing state...")
-            # modifiers change behaviour of a state (they are not a state in their own right)
-            # currently only have a chomp modifier (mouth opening and closing)
-            self.modifier = choices(
-                (None, "chomp"), weights=(1-self.prob_chomp, self.prob_chomp)
-            )[0]
-            if self.modifier == "chomp":
-                print(f"{self.uuid} is chomping")
-            else:
-                print(f"{self.uuid} is not chomping")
-            self.duration_of_current_state = randint(
-                int(self.min_state_duration), int(self.max_state_duration)
-            )
-            self.time_of_last_state_change = now
-            if self.state == "dart":
-                self.state = "swim"
-            else:
-                self.state = choices(
-                    ("swim", "hover", "dart"),
-                    weights=(self.prob_swim, self.prob_hover, self.prob_dart),
-                )[0]
-            if self.state == "dart":
-                self.duration_of_current_state *= 0.4  # darts are shorter duration
-            self.old_speed = self.vel.length()
-            self.new_speed = uniform(
-                self.min_speed[self.state], self.max_speed[self.state]
+    def change_state(self, now):
+        """Picks the next state (now in ms); called when the current one is over"""
+        # print("changing state...")
+        # modifiers change behaviour of a state (they are not a state in their own right)
+        # currently only have a chomp modifier (mouth opening and closing)
+        rng = self.rng
+        self.modifier = rng.weighted_choice(
+            (None, "chomp"), (1 - self.prob_chomp, self.prob_chomp)
+        )
+        if self.modifier == "chomp":
+            print(f"fish {self.number} is chomping")
+        else:
+            print(f"fish {self.number} is not chomping")
+        self.duration_of_current_state = rng.randint(
+            int(self.min_state_duration), int(self.max_state_duration)
+        )
+        self.time_of_last_state_change = now
+        if self.state == "dart":
+            self.state = "swim"
+        else:
+            self.state = rng.weighted_choice(
+                ("swim", "hover", "dart"),
+                (self.prob_swim, self.prob_hover, self.prob_dart),
             )
-            self.transitioning = True
+        if self.state == "dart":
+            self.duration_of_current_state *= 0.4  # darts are shorter duration
+        self.old_speed = self.vel.length()
+        self.new_speed = rng.uniform(
+            self.min_speed[self.state], self.max_speed[self.state]
+        )
+        self.transitioning = True
+
+    def update(self, dt, now):
+        """ dt is frame time step in seconds, now the simulation time in ms """
+        self.prev_pos = vec(self.pos)
         self.last_vel = vec(self.vel)
-        self.acc = self.wander()
+        # wander and schooling share the max-force clamp, see FishEngine.step
+        steer = self.wander(now) + self.school
+        max_force = self.school_force if self.schooling else self.max_force
+        if steer.length_squared() > max_force * max_force:
+            steer.scale_to_length(max_force)
+        self.acc = steer + self.interaction
         self.vel += self.acc * dt
         if self.transitioning:
             frac = (now - self.time_of_last_state_change) / self.acceleration_duration
@@ -318,7 +402,12 @@ class Fish(pg.sprite.Sprite):
             if frac >= 1:
                 self.transitioning = False
         speed = self.vel.length()
-        self.distance += speed * dt
+        self.anim_phase += dt * animation_rate(
+            self.state,
+            speed,
+            self.hover_frame_update_interval,
+            self.swim_dart_frame_update_distance,
+        )
         if not self.transitioning and speed > self.max_speed[self.state]:
             self.vel.scale_to_length(self.max_speed[self.state])
         if speed < self.min_speed[self.state]:
@@ -326,78 +415,851 @@ class Fish(pg.sprite.Sprite):
         self.vel = clamp_angle_to_horizontal(self.vel, self.max_angle_with_horizontal)
         self.pos += self.vel * dt
         self.handle_walls(method="wrap")
-        if (
-            self.state == "hover"
-            and now - self.last_hover_frame_update > self.hover_frame_update_interval
-        ):
-            self.last_hover_frame_update = now
-            if self.vel.x >= 0:
-                # confusingly, not all fish types have chomp frames,
-                # so we need to check if it has_chomp before checking modifier flag
-                if self.has_chomp and self.modifier == "chomp":
-                    self.image = next(self.frames["chomp"]["right"])
-                else:
-                    self.image = next(self.frames["hover"]["right"])
+        self.rect.center = self.pos
+        # a fish out of sight keeps its image until it swims back in
+        if self.rect.colliderect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT):
+            self.image = frame_image(
+                self.frames,
+                self.state,
+                self.modifier,
+                self.has_chomp,
+                self.vel.x >= 0,
+                int(self.anim_phase),
+            )
+
+    def interpolate(self, alpha):
+        """
+        Puts rect alpha of the way from the position before the last update to
+        the current one, the short way round if the fish wrapped
+        """
+        periods = SCREEN_WIDTH + self.rect.w, SCREEN_HEIGHT + self.rect.h
+        center = []
+        for p0, p1, period in zip(self.prev_pos, self.pos, periods):
+            delta = p1 - p0
+            delta -= period * round(delta / period)
+            center.append(p0 + alpha * delta)
+        self.rect.center = center
+
+
+class EngineFish(pg.sprite.Sprite):
+    """
+    Thin drawing view onto one slot of a FishEngine.
+    Kinematics, state changes and the animation cursor all advance in
+    FishEngine.step, and the Aquarium places the rects of all its EngineFish
+    at once for drawing (Aquarium.place_fish). image is looked up from the
+    cursor only when something reads it, so fish that are not drawn never
+    touch their frames.
+    """
+
+    def __init__(self, sprite_group, engine, frames, id, rng, now=0, **kwargs):
+        pg.sprite.Sprite.__init__(self, sprite_group)
+        self.engine = engine
+        self.frames = frames
+        self.id = id
+        params = Fish.DEFAULT_PARAMS.copy()
+        filtered_params = {k: v for k, v in kwargs.items() if v is not None}
+        params.update(filtered_params)
+        self.has_chomp = params.get("has_chomp", False)
+        pos = vec(rng.randint(0, SCREEN_WIDTH), rng.randint(0, SCREEN_HEIGHT))
+        vel = vec(
+            rng.uniform(params["min_speed_swim"], params["max_speed_swim"]), 0
+        ).rotate(rng.angle())
+        # all frames of a fish type are the same size
+        image = self.frames["swim"]["right"][0]
+        self.rect = image.get_rect(center=pos)
+        target = vec(rng.randint(0, SCREEN_WIDTH), rng.randint(0, SCREEN_HEIGHT))
+        self.index = engine.add(
+            params,
+            pos,
+            vel,
+            target,
+            (0.5 * self.rect.w, 0.5 * self.rect.h),
+            now,
+            anim_phase=rng.uniform(0, len(self.frames["swim"]["right"])),
+        )
+        self.bubbling = False  # in the middle of a bubble burst
+        self.burst_random = None  # its species' burst timing, set by Aquarium
+        self.selected = False
+        self.selection_ring_radius = self.rect.w // 2 + 10
+        # for picking, fixed: all frames of a fish type are the same size
+        self.radius = hit_radius(image)
+        self.number = next(fish_numbers)
+
+    def set_frames(self, frames):
+        """Switches to another set of frames, e.g. of another sprite size"""
+        self.frames = frames
+        image = self.frames["swim"]["right"][0]
+        self.rect = image.get_rect(center=self.rect.center)
+        self.engine.half_size[self.index] = (0.5 * self.rect.w, 0.5 * self.rect.h)
+        self.selection_ring_radius = self.rect.w // 2 + 10
+        self.radius = hit_radius(image)
+
+    @property
+    def pos(self):
+        return vec(*self.engine.pos[self.index])
+
+    @property
+    def vel(self):
+        return vec(*self.engine.vel[self.index])
+
+    @property
+    def state(self):
+        return STATES[self.engine.state[self.index]]
+
+    @property
+    def modifier(self):
+        return "chomp" if self.engine.chomp[self.index] else None
+
+    @property
+    def image(self):
+        i = self.index
+        engine = self.engine
+        return frame_image(
+            self.frames,
+            STATES[engine.state[i]],
+            "chomp" if engine.chomp[i] else None,
+            self.has_chomp,
+            engine.vel[i, 0] >= 0,
+            int(engine.anim_phase[i]),
+        )
+
+    def kill(self):
+        if self.index is not None:
+            self.engine.remove(self.index)
+            self.index = None
+        pg.sprite.Sprite.kill(self)
+
+
+def random_fish_props(fish_type, rng):
+    """Draws one set of properties for fish_type from the ranges in fish_properties"""
+    fish_props = {}
+    for k, v in fish_properties[fish_type].items():
+        if isinstance(v, (list, tuple)) and len(v) == 2:
+            fish_props[k] = rng.uniform(v[0], v[1])
+        else:
+            fish_props[k] = v
+    return fish_props
+
+
+def get_species_frames(fish_frames, fish_type, fish_colour, has_chomp):
+    """
+    Returns the animation frames for one species (type + colour) as
+    frames[state][direction], where state is hover, swim, dart (and chomp if
+    has_chomp) and direction is left or right.
+    """
+    hover_left_dict_key = fish_type + "_" + fish_colour + "_" + "idle" + "_" + "left"
+    hover_right_dict_key = fish_type + "_" + fish_colour + "_" + "idle" + "_" + "right"
+    swim_left_dict_key = fish_type + "_" + fish_colour + "_" + "swim" + "_" + "left"
+    swim_right_dict_key = fish_type + "_" + fish_colour + "_" + "swim" + "_" + "right"
+    dart_left_dict_key = fish_type + "_" + fish_colour + "_" + "swim" + "_" + "left"
+    dart_right_dict_key = fish_type + "_" + fish_colour + "_" + "swim" + "_" + "right"
+    chomp_left_dict_key = (
+        fish_type + "_" + fish_colour + "_" + "swim-chomp" + "_" + "left"
+    )
+    chomp_right_dict_key = (
+        fish_type + "_" + fish_colour + "_" + "swim-chomp" + "_" + "right"
+    )
+    frames = {
+        "hover": {
+            "left": fish_frames[hover_left_dict_key],
+            "right": fish_frames[hover_right_dict_key],
+        },
+        "swim": {
+            "left": fish_frames[swim_left_dict_key],
+            "right": fish_frames[swim_right_dict_key],
+        },
+        "dart": {
+            "left": fish_frames[dart_left_dict_key],
+            "right": fish_frames[dart_right_dict_key],
+        },
+    }
+    # not all fish types have chomp frames
+    if has_chomp:
+        frames["chomp"] = {
+            "left": fish_frames[chomp_left_dict_key],
+            "right": fish_frames[chomp_right_dict_key],
+        }
+    return frames
+
+
+def prepare_species_frames(fish_frames, fish_type, fish_colour, has_chomp):
+    """
+    The part of get_species_frames that can run on a loader thread: a
+    FrameProvider decodes and packs the species' frame sets, leaving the
+    conversion to the display format for get_species_frames on the main thread.
+    Returns fish_frames.
+    """
+    if isinstance(fish_frames, FrameProvider):
+        states = ("idle", "swim", "swim-chomp") if has_chomp else ("idle", "swim")
+        fish_frames.prepare(fish_type, fish_colour, states)
+    return fish_frames
+
+
+def species_number(fish_type, fish_colour):
+    """Number telling species (type + colour) apart, e.g. for schooling"""
+    return int(fish_type) * NUM_COLOURS + COLOUR_INDEX[fish_colour]
+
+
+def plan_species(max_num_fish, rng):
+    """
+    Draws random species, and a random number of pairs of each, until there are
+    at least max_num_fish fish. Returns [(fish_type, fish_colour, fish_props,
+    num_fish), ...], one entry per species drawn.
+    """
+    plan = []
+    num_fish = 0
+    while num_fish < max_num_fish:
+        fish_type = str(rng.randint(1, 6))
+        fish_props = random_fish_props(fish_type, rng)
+        fish_colour = rng.choice(("blue", "green", "orange", "pink", "red", "yellow"))
+        num_pairs = rng.randint(*MIN_MAX_NUM_PAIRS[fish_type])
+        plan.append((fish_type, fish_colour, fish_props, 2 * num_pairs))
+        num_fish += 2 * num_pairs
+    return plan
+
+
+def spawn_species(
+    screen, fish_sprites, frames, id, fish_props, num, rng, engine=None, now=0
+):
+    """
+    Spawns num fish of one species with frames from get_species_frames, at
+    simulation time now (ms). If engine is given the fish are EngineFish views
+    onto it, otherwise they are Fish, each with its own substream of the
+    SimRandom rng. Returns the new fish.
+    """
+    fishes = []
+    for i in range(num):
+        if engine is not None:
+            fish = EngineFish(fish_sprites, engine, frames, id, rng, now, **fish_props)
+        else:
+            fish_rng = rng.substream(i)
+            fish = Fish(screen, fish_sprites, frames, id, fish_rng, now, **fish_props)
+        fishes.append(fish)
+    return fishes
+
+
+def spawn_fish(
+    screen,
+    fish_sprites,
+    fish_frames,
+    max_num_fish,
+    rng,
+    engine=None,
+    now=0,
+):
+    """
+    Spawns random pairs of fish of random species until there are at least
+    max_num_fish (see plan_species and spawn_species), each species from its
+    own substream of rng. Returns the number of fish spawned.
+    """
+    num_fish = 0
+    for i, (fish_type, fish_colour, fish_props, num) in enumerate(
+        plan_species(max_num_fish, rng)
+    ):
+        # key = str(i) + "_" + colour + "_" + state + "_" + direction
+        frames = get_species_frames(
+            fish_frames, fish_type, fish_colour, fish_props["has_chomp"]
+        )
+        id = fish_type + "_" + fish_colour
+        spawn_species(
+            screen,
+            fish_sprites,
+            frames,
+            id,
+            dict(fish_props, species=species_number(fish_type, fish_colour)),
+            num,
+            rng.substream(i),
+            engine,
+            now,
+        )
+        num_fish += num
+    return num_fish
+
+
+class Aquarium:
+    """
+    Everything in the tank: fish, bubbles, coral, sea-grass and the scrolling
+    foreground "undersea" filter.
+    update() advances fish and bubbles, animate_scenery() sways the sea-grass and
+    scrolls the filter, and draw() renders a frame onto any surface, so main(),
+    the headless runner and the benchmarks all drive exactly the same code.
+    Both read the time from self.clock, a SimClock the caller ticks once per
+    frame (with real time in main(), synthetic time elsewhere), or once per
+    fixed step, in which case interpolate() places the sprites between steps.
+    Scenery and overlay images need a display mode set (convert_alpha), so pass
+    scenery=False and overlay=False to run without one.
+    Given an AssetLoader, the tank is empty at first: scenery, overlay and each
+    species' fish appear as poll_assets() finds their images decoded.
+    Every random number in the tank comes from self.random, a SimRandom made
+    from seed here, or one of its substreams, so a seed reproduces the run.
+    """
+
+    def __init__(
+        self,
+        screen,
+        num_fish=MAX_NUM_FISH,
+        size="FIFTH",
+        use_engine=USE_FISH_ENGINE,
+        scenery=True,
+        overlay=True,
+        lazy_frames=LAZY_FRAMES,
+        frame_atlas=FRAME_ATLAS,
+        overlay_interval=OVERLAY_INTERVAL,
+        overlay_quality=OVERLAY_QUALITY,
+        seed=SEED,
+        clock=None,
+        engine_workers=ENGINE_WORKERS,
+        loader=None,
+        schooling=SCHOOLING,
+    ):
+        self.screen = screen
+        self.clock = SimClock() if clock is None else clock
+        self.random = SimRandom(seed)
+        self.fish_sprites = LayerGroup()
+        self.bubbles = BubblePool(rng=self.random.substream("bubbles").generator)
+        self.renderer = BatchRenderer()
+        self.renderer.add_layer(self.fish_sprites, overlays=True)
+        # fish wrapping round the edges are skipped while out of sight
+        self.renderer.view = pg.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.renderer.add_pool(self.bubbles)
+        # dirty-rect mode state, see draw_dirty
+        self.dirty_tiles = DirtyTiles((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.last_drawn_rects = []
+        self.overlay_interval = overlay_interval
+        self.frames_since_overlay = 0
+        self.full_redraw_due = True
+        self.show_scenery = False  # until loaded
+        self.show_overlay = False
+        self.overlay_enabled = True  # show the overlay once loaded
+        self.show_hitboxes = False
+        self.hovered = None  # fish under the cursor, highlighted
+        self.picker = Picker()
+        self.picker_stale = False  # fish moved since the picker last saw them
+        # fish timers: bubble bursts, the bubbles within a burst, and state
+        # changes (per-fish path only, FishEngine.step handles its own)
+        self.scheduler = Scheduler()
+        self.pending_bubbles = []
+        self.lazy_frames = lazy_frames
+        self.frame_atlas = frame_atlas
+        # species' frames first load at spawn_size, see set_sprite_size
+        self.sprite_size = self.spawn_size = size.upper()
+        self.fish_frames = self.new_frame_provider(size)
+        self.frame_providers = {self.spawn_size: self.fish_frames}
+        self.species = {}  # id -> (fish_type, fish_colour, has_chomp)
+        self.species_frames = {}  # (size, id) -> frames
+        self.engine = None
+        # EngineFish rects, placed from the engine arrays (see place_fish)
+        self.fish_placed = True
+        self.placed_version = -1
+        self.placed_fishes = []
+        self.placed_slots = np.zeros(0, dtype=np.int64)
+        self.placed_centres = np.zeros((0, 2))
+        # Fish properties for update_interactions, cached until fish are added
+        self.interacting_version = -1
+        self.interacting = {}
+        if use_engine and engine_workers:
+            # only sharded runs pay for importing multiprocessing
+            from sharded_engine import ShardedFishEngine
+
+            # shared arrays cannot grow: room for the last species' pairs too
+            max_pairs = max(hi for _, hi in MIN_MAX_NUM_PAIRS.values())
+            self.engine = ShardedFishEngine(
+                SCREEN_WIDTH,
+                SCREEN_HEIGHT,
+                num_fish + 2 * max_pairs,
+                engine_workers,
+                rng=self.random.substream("engine").generator,
+            )
+        elif use_engine:
+            self.engine = FishEngine(
+                SCREEN_WIDTH,
+                SCREEN_HEIGHT,
+                rng=self.random.substream("engine").generator,
+            )
+
+        # assets: with a loader each is decoded in the background and comes
+        # into the tank when ready (see poll_assets), otherwise right here
+        self.loader = loader
+        self.pending_assets = []  # ([task keys], callback(*results))
+        spawn_random = self.random.substream("spawn")
+        # bursts too: the main stream would be drawn in the order species load
+        burst_random = self.random.substream("bursts")
+        plan = plan_species(num_fish, spawn_random)
+        self.num_fish = sum(num for *_, num in plan)
+        for i, (fish_type, fish_colour, fish_props, num) in enumerate(plan):
+            fish_props = dict(
+                fish_props,
+                species=species_number(fish_type, fish_colour),
+                schooling=schooling and not fish_props.get("predator", False),
+            )
+            # a species can be drawn more than once, its fish all one species
+            self.species.setdefault(
+                fish_type + "_" + fish_colour,
+                (fish_type, fish_colour, fish_props["has_chomp"]),
+            )
+            self.load(
+                partial(
+                    self.add_species,
+                    fish_type + "_" + fish_colour,
+                    fish_props,
+                    num,
+                    spawn_random.substream(i),
+                    burst_random.substream(i),
+                ),
+                (
+                    ("species", i),
+                    prepare_species_frames,
+                    self.fish_frames,
+                    fish_type,
+                    fish_colour,
+                    fish_props["has_chomp"],
+                ),
+            )
+        if scenery:
+            self.load_scenery()
+        if overlay:
+            self.load_overlay(overlay_quality)
+
+    def load(self, callback, *tasks):
+        """
+        Runs each (key, fn, *args) task then callback(*results): on the loader
+        if there is one (callback from poll_assets), otherwise right away.
+        """
+        if self.loader is None:
+            callback(*(fn(*args) for _, fn, *args in tasks))
+            return
+        for key, fn, *args in tasks:
+            self.loader.submit(key, fn, *args)
+        self.pending_assets.append(([key for key, *_ in tasks], callback))
+
+    def poll_assets(self):
+        """Brings whatever the loader has finished into the tank"""
+        if not self.pending_assets:
+            return
+        loader = self.loader
+        pending = []
+        for keys, callback in self.pending_assets:
+            if all(loader.ready(key) for key in keys):
+                callback(*(loader.result(key) for key in keys))
             else:
-                if self.has_chomp and self.modifier == "chomp":
-                    self.image = next(self.frames["chomp"]["left"])
-                else:
-                    self.image = next(self.frames["hover"]["left"])
-        elif (
-            self.state in ["swim", "dart"]
-            and self.distance > self.swim_dart_frame_update_distance
-        ):
-            self.distance = 0
-            if self.vel.x >= 0:
-                if self.has_chomp and self.modifier == "chomp":
-                    self.image = next(self.frames["chomp"]["right"])
-                else:
-                    self.image = next(self.frames[self.state]["right"])
+                pending.append((keys, callback))
+        self.pending_assets = pending
+
+    def add_species(self, id, fish_props, num, rng, burst_rng, fish_frames):
+        """
+        Spawns num fish of species id, with frames from fish_frames (as
+        prepared by prepare_species_frames), and starts their timers. Their
+        bubble bursts are timed from the SimRandom burst_rng.
+        """
+        now = self.clock.now
+        if (self.spawn_size, id) not in self.species_frames:
+            self.species_frames[self.spawn_size, id] = get_species_frames(
+                fish_frames, *self.species[id]
+            )
+        # the sprite size may have changed while these frames were loading
+        frames = self.species_frames.get(
+            (self.sprite_size, id), self.species_frames[self.spawn_size, id]
+        )
+        fishes = spawn_species(
+            self.screen,
+            self.fish_sprites,
+            frames,
+            id,
+            fish_props,
+            num,
+            rng,
+            self.engine,
+            now,
+        )
+        for fish in fishes:
+            fish.burst_random = burst_rng
+            self.scheduler.schedule(
+                now + burst_rng.randint(*BUBBLE_INTERVAL), self.bubble_burst, fish
+            )
+            if self.engine is None:
+                self.scheduler.schedule(
+                    now + fish.duration_of_current_state, self.state_change, fish
+                )
+
+    def new_frame_provider(self, size):
+        if self.lazy_frames:
+            return FrameProvider(size, atlas=self.frame_atlas)
+        return get_frames(size, atlas=self.frame_atlas)
+
+    def set_sprite_size(self, size):
+        """
+        Switches every fish to the sprite sheet of size (e.g. "EIGHTH"), its
+        frames loaded like the first ones (see load). Frames already loaded for
+        a size are kept, so switching back to it is immediate.
+        """
+        size = size.upper()
+        if size == self.sprite_size:
+            return
+        self.sprite_size = size
+        if size not in self.frame_providers:
+            self.frame_providers[size] = self.new_frame_provider(size)
+        for id, (fish_type, fish_colour, has_chomp) in self.species.items():
+            if (size, id) in self.species_frames:
+                self.add_frames(size, id, self.frame_providers[size])
             else:
-                if self.has_chomp and self.modifier == "chomp":
-                    self.image = next(self.frames["chomp"]["left"])
-                else:
-                    self.image = next(self.frames[self.state]["left"])
-        # for collision detection using pg.sprite.collide_circle
-        # 0.2 found by trial and error
-        self.radius = 0.2 * sum(self.image.get_size())
-        self.rect.center = self.pos
+                self.load(
+                    partial(self.add_frames, size, id),
+                    (
+                        ("frames", size, id),
+                        prepare_species_frames,
+                        self.frame_providers[size],
+                        fish_type,
+                        fish_colour,
+                        has_chomp,
+                    ),
+                )
+
+    def add_frames(self, size, id, fish_frames):
+        """
+        Keeps the frames of species id at size from fish_frames, and gives them
+        to its fish if size is current
+        """
+        if (size, id) not in self.species_frames:
+            self.species_frames[size, id] = get_species_frames(
+                fish_frames, *self.species[id]
+            )
+        frames = self.species_frames[size, id]
+        if size != self.sprite_size:
+            return
+        for fish in self.fish_sprites:
+            if fish.id == id:
+                fish.set_frames(frames)
+        self.renderer.forget_images()
+        self.full_redraw_due = True
+
+    def set_overlay_enabled(self, enabled):
+        """Shows or hides the foreground filter (shown once loaded if enabled)"""
+        self.overlay_enabled = enabled
+        self.show_overlay = enabled and hasattr(self, "filter")
+        self.full_redraw_due = True
+
+    def close(self):
+        """Stops any engine worker processes"""
+        if self.engine is not None:
+            self.engine.close()
+
+    def load_scenery(self):
+        self.load(
+            self.add_scenery,
+            ("seagrass", pg.image.load, SEAGRASS_PATH),
+            ("coral", pg.image.load, CORAL_PATH),
+        )
+
+    def add_scenery(self, seagrass, coral):
+        # coral and sea-grass, cached (see scenery.Scenery)
+        self.scenery = Scenery(SCREEN_WIDTH, SCREEN_HEIGHT, seagrass, coral)
+        self.show_scenery = True
+        self.full_redraw_due = True
+
+    def load_overlay(self, quality=OVERLAY_QUALITY):
+        self.load(
+            partial(self.add_overlay, quality),
+            ("underseaT1", pg.image.load, "underseaT1.png"),
+            ("underseaT2", pg.image.load, "underseaT2.png"),
+        )
+
+    def add_overlay(self, quality, img1, img2):
+        # For scrolling foreground "undersea" filter
+        filter_vel = 60  # pixels/s
+        self.filter = ScrollingOverlay(
+            img1.convert_alpha(), img2.convert_alpha(), filter_vel, quality
+        )
+        self.show_overlay = self.overlay_enabled
+        self.full_redraw_due = True
+
+    def bubble_burst(self, now, fish, repeat=True):
+        """
+        Starts a burst of BUBBLES_PER_BURST bubbles, BUBBLE_SPACING ms apart,
+        from fish, unless it is still bubbling. With repeat, also schedules the
+        fish's next burst.
+        """
+        if not fish.alive():
+            return
+        rng = fish.burst_random
+        if repeat:
+            self.scheduler.schedule(
+                now + rng.randint(*BUBBLE_INTERVAL), self.bubble_burst, fish
+            )
+        num_bubbles = rng.randint(*BUBBLES_PER_BURST)
+        if fish.bubbling or not num_bubbles:
+            return
+        fish.bubbling = True
+        for i in range(num_bubbles):
+            last = i == num_bubbles - 1
+            self.scheduler.schedule(now + BUBBLE_SPACING * i, self.bubble, fish, last)
+
+    def bubble(self, now, fish, last):
+        if not fish.alive():
+            return
+        # from where the fish is now, which its rect may not show yet
+        x, y = fish.pos
+        half_w = 0.5 * fish.rect.w
+        self.pending_bubbles.append((x + half_w if fish.vel.x >= 0 else x - half_w, y))
+        if last:
+            fish.bubbling = False
+
+    def state_change(self, now, fish):
+        if not fish.alive():
+            return
+        if fish.transitioning:
+            # still easing into the current state, try again once that is over
+            done = fish.time_of_last_state_change + fish.acceleration_duration
+            self.scheduler.schedule(max(now, done) + 1, self.state_change, fish)
+            return
+        fish.change_state(now)
+        self.scheduler.schedule(
+            now + fish.duration_of_current_state, self.state_change, fish
+        )
+
+    def update(self):
+        """Advances fish and bubbles by the last tick of self.clock"""
+        dt, now = self.clock.dt, self.clock.now
+        self.scheduler.run_due(now)
+        if self.pending_bubbles:
+            self.bubbles.emit(self.pending_bubbles)
+            self.pending_bubbles = []
+        if self.engine is not None:
+            # the EngineFish rects are only placed for drawing (see place_fish)
+            self.engine.step(dt, now)
+            self.fish_placed = False
+        else:
+            self.update_interactions()
+            self.fish_sprites.update(dt, now)
+        self.bubbles.update(dt)
+
+    def update_interactions(self):
+        """
+        Sets each Fish's pursuit or flight steer and schooling steer, the
+        per-fish counterpart of FishEngine.update_interactions
+        """
+        props = self.interacting
+        if self.interacting_version != self.fish_sprites.version:
+            fishes = self.fish_sprites.sprites()
+
+            def values(name):
+                return np.array([getattr(fish, name) for fish in fishes])
+
+            props = self.interacting = {"fishes": fishes}
+            props["predator"] = values("predator").astype(bool)
+            props["hunters"] = np.flatnonzero(props["predator"])
+            props["flock"] = np.flatnonzero(values("schooling").astype(bool))
+            for name in (
+                "sense_radius",
+                "flee_radius",
+                "pursue_force",
+                "flee_force",
+                "species",
+                "school_cell_size",
+                "separation_cell_size",
+                "school_force",
+                "separation_weight",
+                "alignment_weight",
+                "cohesion_weight",
+            ):
+                props[name] = values(name)
+            # the steers last written to the fish, see below
+            props["interaction"] = values("interaction").reshape(-1, 2)
+            props["school"] = values("school").reshape(-1, 2)
+            self.interacting_version = self.fish_sprites.version
+        fishes = props["fishes"]
+        hunters = props["hunters"]
+        flock = props["flock"]
+        if not len(hunters) and not len(flock):
+            return
+        pos = np.array([fish.pos for fish in fishes])
+        vel = np.array([fish.vel for fish in fishes])
+        max_speed = np.array([fish.max_speed[fish.state] for fish in fishes])
+        interaction = np.zeros((len(fishes), 2))
+        school = np.zeros((len(fishes), 2))
+        if len(hunters):
+            interaction = predator_prey_steer(
+                pos,
+                vel,
+                props["predator"],
+                props["sense_radius"],
+                props["flee_radius"],
+                max_speed,
+                props["pursue_force"],
+                props["flee_force"],
+            )
+        if len(flock):
+            school = school_steer(
+                flock,
+                pos,
+                vel,
+                props["species"],
+                props["school_cell_size"][flock].max(),
+                props["separation_cell_size"][flock].max(),
+                max_speed,
+                props["school_force"],
+                props["separation_weight"],
+                props["alignment_weight"],
+                props["cohesion_weight"],
+            )
+        # most fish are out of reach of any predator or school mate, so only
+        # the steers that changed are written back
+        for name, steer in (("interaction", interaction), ("school", school)):
+            changed = np.flatnonzero((steer != props[name]).any(axis=1))
+            props[name] = steer
+            for k, (x, y) in zip(changed.tolist(), steer[changed].tolist()):
+                getattr(fishes[k], name).update(x, y)
+
+    def interpolate(self, alpha):
+        """
+        Places fish and bubbles alpha (0 to 1) of the way from their positions
+        before the last update to their current ones
+        """
+        if self.engine is not None:
+            self.place_fish(alpha)
+        else:
+            for fish in self.fish_sprites:
+                fish.interpolate(alpha)
+        self.bubbles.alpha = alpha
+        self.picker_stale = True
+
+    def place_fish(self, alpha=1):
+        """
+        Moves the EngineFish rects alpha of the way from their positions before
+        the last step to their current ones, all read from the engine at once
+        """
+        if self.placed_version != self.fish_sprites.version:
+            self.placed_fishes = self.fish_sprites.sprites()
+            self.placed_slots = np.array(
+                [fish.index for fish in self.placed_fishes], dtype=np.int64
+            )
+            self.placed_version = self.fish_sprites.version
+        if alpha >= 1:
+            pos = self.engine.pos[self.placed_slots]
+        else:
+            pos = self.engine.interpolated_pos(alpha)[self.placed_slots]
+        # flat lists of floats: a list per fish would keep the garbage
+        # collector busy scanning every sprite
+        xs, ys = pos[:, 0].tolist(), pos[:, 1].tolist()
+        for fish, x, y in zip(self.placed_fishes, xs, ys):
+            fish.rect.center = x, y
+        # as Rect rounds them, half away from zero
+        self.placed_centres = np.trunc(pos + np.copysign(0.5, pos))
+        self.fish_placed = True
+        self.picker_stale = True
+
+    def pick(self, pos, radius=0):
+        """
+        Fish within radius of pos where they were last drawn (as placed by
+        interpolate), pixel-accurate if PIXEL_PICKING
+        """
+        if self.picker_stale:
+            if self.engine is not None:
+                self.picker.update(self.placed_fishes, self.placed_centres)
+            else:
+                self.picker.update(self.fish_sprites)
+            self.picker_stale = False
+        return self.picker.pick(pos, radius, PIXEL_PICKING)
+
+    def animate_scenery(self):
+        """Sways the sea-grass and scrolls the foreground filter (display rate)"""
+        dt = self.clock.frame_dt
+        if self.show_scenery:
+            self.scenery.update(dt)
+        if self.show_overlay:
+            self.filter.update(dt)
+
+    def seagrass_image(self):
+        """Returns the sea-grass image at its current sway and its topleft"""
+        return self.scenery.seagrass_image()
+
+    def draw_scenery(self, surface, seagrass):
+        self.scenery.draw(surface, seagrass)
+
+    def draw_overlay(self, surface, filter_offset):
+        # Scrolling foreground filter
+        self.filter.draw(surface, filter_offset)
+
+    def draw(self, surface):
+        if not self.fish_placed:
+            self.place_fish()  # updated without interpolate()
+        surface.fill(BACKGROUND_COLOUR)
+
+        self.renderer.show_hitboxes = self.show_hitboxes
+        self.renderer.hovered = self.hovered
+        self.renderer.draw(surface)
+
+        if self.show_scenery:
+            self.draw_scenery(surface, self.seagrass_image())
+
+        if self.show_overlay:
+            self.drawn_filter_offset = self.filter.offset
+            self.draw_overlay(surface, self.drawn_filter_offset)
+
+        # selection rings and hit-boxes, collected while drawing the fish
+        self.renderer.draw_overlays(surface)
+
+    def draw_dirty(self, surface, extra_rects=()):
+        """
+        Dirty-rectangle version of draw: redraws only the screen tiles covered
+        by sprites, rings, the swaying sea-grass and extra_rects (e.g. a cursor
+        drawn afterwards) this frame or last frame, and returns the list of
+        rects that changed, for pg.display.update.
+        The full-screen filter is moved only every overlay_interval frames; on
+        those frames, the first frame, or when most of the screen is dirty
+        anyway, the whole frame is drawn and the screen rect returned.
+        """
+        self.frames_since_overlay += 1
+        full_redraw = self.full_redraw_due or (
+            self.show_overlay and self.frames_since_overlay >= self.overlay_interval
+        )
+        if full_redraw:
+            self.full_redraw_due = False
+            self.frames_since_overlay = 0
+
+        if not self.fish_placed:
+            self.place_fish()  # updated without interpolate()
+        self.renderer.show_hitboxes = self.show_hitboxes
+        self.renderer.hovered = self.hovered
+        sequence = [pair for layer in self.renderer.sequences() for pair in layer]
+        rings = self.renderer.overlays
+        sprite_rects = [rect for _, rect in sequence]
+        ring_rects = [rect for _, rect in rings]
+        drawn_rects = sprite_rects + ring_rects + [pg.Rect(r) for r in extra_rects]
+        if self.show_scenery:
+            seagrass = self.seagrass_image()
+            drawn_rects.append(pg.Rect(seagrass[1], seagrass[0].get_size()))
+        tiles = self.dirty_tiles
+        tiles.mark(self.last_drawn_rects)
+        tiles.mark(drawn_rects)
+        # copy, sprite rects are moved in place
+        self.last_drawn_rects = [tuple(rect) for rect in drawn_rects]
+
+        if full_redraw or tiles.dirty_fraction() > FULL_REDRAW_FRACTION:
+            tiles.spans()  # clear
+            self.draw(surface)
+            return [surface.get_rect()]
+
+        spans = tiles.spans()
+        for span in spans:
+            surface.set_clip(span)
+            surface.fill(BACKGROUND_COLOUR)
+            submit(surface, [sequence[i] for i in span.collidelistall(sprite_rects)])
+            if self.show_scenery:
+                self.draw_scenery(surface, seagrass)
+            if self.show_overlay:
+                self.draw_overlay(surface, self.drawn_filter_offset)
+            submit(surface, [rings[i] for i in span.collidelistall(ring_rects)])
+        surface.set_clip(None)
+        return spans
 
 
 def main():
-    pg.init()
+    # just the display (with events, timer and mouse): nothing else is used
+    pg.display.init()
     screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     clock = pg.time.Clock()
 
     pg.mouse.set_visible(False)
-    fish_sprites = pg.sprite.Group()
-    bubble_sprites = pg.sprite.Group()
-    all_sprites = pg.sprite.Group()
-
-    # sea-grass
-    seagrass_scalefactor = 0.3
-    seagrass = pg.image.load("seagrass.png").convert_alpha()
-    seagrass = pg.transform.rotozoom(seagrass, 0, seagrass_scalefactor)
-    seagrass_w, seagrass_h = seagrass.get_size()
-
-    # coral
-    coral0 = pg.image.load("coral.png").convert_alpha()
-
-    coral1 = pg.transform.rotozoom(coral0, 0, 0.3)
-    coral1_w, coral1_h = coral1.get_size()
-    coral1_blit_pos = 20, SCREEN_HEIGHT - coral1_h + 20
-
-    coral2 = pg.transform.flip(coral1, True, False)
-    coral2 = pg.transform.rotozoom(coral0, 0, 0.2)
-    coral2_w, coral2_h = coral2.get_size()
-    coral2_blit_pos = SCREEN_WIDTH - coral2_w, SCREEN_HEIGHT - coral2_h + 20
-
-    # For scrolling foreground "undersea" filter
-    filter_x1, filter_y1 = 0, 0
-    filter_x2, filter_y2 = -SCREEN_WIDTH, 0
-    filter_vel = 60  # pixels/s
-    filter_img1 = pg.image.load("underseaT1.png").convert_alpha()
-    filter_img2 = pg.image.load("underseaT2.png").convert_alpha()
 
     cursor = pg.sprite.Sprite()
 
@@ -408,90 +1270,28 @@ def main():
     )
     cursor.rect = cursor.image.get_rect()
 
-    fish_frames = get_frames("FIFTH")
-    num_fish = 0
-    while True:
-        # key = str(i) + "_" + colour + "_" + state + "_" + direction
-        fish_type = str(randint(1, 6))
-        fish_props_ranges = fish_properties[fish_type]
-        fish_props = {}
-        for k, v in fish_props_ranges.items():
-            if isinstance(v, (list, tuple)) and len(v) == 2:
-                fish_props[k] = uniform(v[0], v[1])
-            else:
-                fish_props[k] = v
-        # pprint(fish_props)
-        fish_colour = choice(("blue", "green", "orange", "pink", "red", "yellow"))
-        hover_left_dict_key = (
-            fish_type + "_" + fish_colour + "_" + "idle" + "_" + "left"
-        )
-        hover_right_dict_key = (
-            fish_type + "_" + fish_colour + "_" + "idle" + "_" + "right"
-        )
-        swim_left_dict_key = fish_type + "_" + fish_colour + "_" + "swim" + "_" + "left"
-        swim_right_dict_key = (
-            fish_type + "_" + fish_colour + "_" + "swim" + "_" + "right"
-        )
-        dart_left_dict_key = fish_type + "_" + fish_colour + "_" + "swim" + "_" + "left"
-        dart_right_dict_key = (
-            fish_type + "_" + fish_colour + "_" + "swim" + "_" + "right"
-        )
-        chomp_left_dict_key = (
-            fish_type + "_" + fish_colour + "_" + "swim-chomp" + "_" + "left"
-        )
-        chomp_right_dict_key = (
-            fish_type + "_" + fish_colour + "_" + "swim-chomp" + "_" + "right"
-        )
-        frames = {
-            "hover": {
-                "left": fish_frames[hover_left_dict_key],
-                "right": fish_frames[hover_right_dict_key],
-            },
-            "swim": {
-                "left": fish_frames[swim_left_dict_key],
-                "right": fish_frames[swim_right_dict_key],
-            },
-            "dart": {
-                "left": fish_frames[dart_left_dict_key],
-                "right": fish_frames[dart_right_dict_key],
-            },
-        }
-        # not all fish types have chomp frames
-        if fish_props["has_chomp"]:
-            frames["chomp"] = {
-                "left": fish_frames[chomp_left_dict_key],
-                "right": fish_frames[chomp_right_dict_key],
-            }
-        id = fish_type + "_" + fish_colour
-        num_pairs = randint(*MIN_MAX_NUM_PAIRS[fish_type])
-        for i in range(num_pairs):
-            num_fish += 2
-            Fish(screen, fish_sprites, frames, id, **fish_props)
-            Fish(screen, fish_sprites, frames, id, **fish_props)
-        if num_fish >= MAX_NUM_FISH:
-            break
-
-    print(f"{num_fish=}")
-
-    paused = False
-    show_hitboxes = False
+    sim_clock = SimClock(rate=SIM_RATE, max_substeps=MAX_SUBSTEPS)
+    loader = AssetLoader()
+    aquarium = Aquarium(screen, clock=sim_clock, loader=loader)
+    fish_sprites = aquarium.fish_sprites
+    governor = QualityGovernor(aquarium, 1000 / FPS) if ADAPTIVE_QUALITY else None
+
+    print(f"num_fish={aquarium.num_fish}")
+
     running = True
     num_fish_selected = 0
     selected_fishes = {}
-    counter = 0
-    seagrass_sway_amplitude = 0.5
-    seagrass_sway_freq = 0.05
-    seagrass_base_pos = SCREEN_WIDTH//2-50, SCREEN_HEIGHT
     while running:
         cursor.rect.center = pg.mouse.get_pos()
-        dt = 0.001 * clock.tick(FPS)  # sec
+        real_dt = 0.001 * clock.tick(FPS)  # sec
+        if governor is not None:
+            # time spent on the last frame, not waiting to hold FPS
+            governor.record(clock.get_rawtime())
         for event in pg.event.get():
             if event.type == pg.QUIT:
                 running = False
             if event.type == pg.MOUSEBUTTONUP:
-                hit_fishes = pg.sprite.spritecollide(
-                    cursor, fish_sprites, False, pg.sprite.collide_circle
-                )
+                hit_fishes = aquarium.pick(cursor.rect.center, cursor.radius)
                 for fish in hit_fishes:
                     id = fish.id
                     if fish.selected:
@@ -510,9 +1310,13 @@ def main():
                 if event.key == pg.K_ESCAPE:
                     running = False
                 elif event.key == pg.K_SPACE:
-                    paused = not paused
+                    sim_clock.toggle_pause()
+                elif event.key in (pg.K_EQUALS, pg.K_PLUS, pg.K_KP_PLUS):
+                    sim_clock.scale = min(sim_clock.scale * 2, MAX_TIME_SCALE)
+                elif event.key in (pg.K_MINUS, pg.K_KP_MINUS):
+                    sim_clock.scale = max(sim_clock.scale / 2, MIN_TIME_SCALE)
                 elif event.key == pg.K_h:
-                    show_hitboxes = not show_hitboxes
+                    aquarium.show_hitboxes = not aquarium.show_hitboxes
 
         # remove matched fish
         selected_fishes_copy = selected_fishes.copy()
@@ -524,75 +1328,34 @@ def main():
                 selected_fishes_copy[id] = []
         selected_fishes = selected_fishes_copy.copy()
 
-        screen.fill(BACKGROUND_COLOUR)
-
-        now = pg.time.get_ticks()
-        for fish in fish_sprites:
-            if fish.bubbling:
-                if fish.bubble_times is None:
-                    fish.bubble_times = iter(
-                        [now + 200 * i for i in range(randint(1, 10))]
-                    )
-                    fish.bd = next(fish.bubble_times)
-                if now >= fish.bd:
-                    try:
-                        fish.bd = next(fish.bubble_times)
-                        if fish.vel.x >= 0:
-                            bubble_pos = fish.rect.midright
-                        else:
-                            bubble_pos = fish.rect.midleft
-                        Bubble(bubble_sprites, bubble_pos)
-                    except StopIteration:
-                        fish.bubbling = False
-                        fish.bubble_times = None
-
-        all_sprites.add(fish_sprites, bubble_sprites)
-
         #  update
-        if not paused:
-            all_sprites.update(dt)
-        pg.display.set_caption(f"{clock.get_fps():.0f}")
-        if len(fish_sprites) == 0:
+        aquarium.poll_assets()
+        for _ in sim_clock.steps(real_dt):
+            aquarium.update()
+        aquarium.interpolate(sim_clock.alpha)
+        hovered = aquarium.pick(cursor.rect.center, cursor.radius)
+        aquarium.hovered = hovered[-1] if hovered else None
+        caption = f"{clock.get_fps():.0f}"
+        if governor is not None and governor.level:
+            caption += f"  quality -{governor.level}"
+        num_loaded, num_assets = loader.progress()
+        if num_loaded < num_assets:
+            caption += f"  loading {num_loaded}/{num_assets}"
+        pg.display.set_caption(caption)
+        if len(fish_sprites) == 0 and not aquarium.pending_assets:
             running = False
+        aquarium.animate_scenery()
         # draw
-        all_sprites.draw(screen)
-
-        # coral
-        screen.blit(coral1, coral1_blit_pos)
-        screen.blit(coral2, coral2_blit_pos)
-
-        # sea-grass
-        counter += 1
-        seagrass_angle = seagrass_sway_amplitude * math.sin(seagrass_sway_freq * counter)
-        rect = blit_rotate(screen, seagrass, seagrass_base_pos, (seagrass_w//2, seagrass_h), seagrass_angle)
-
-        # Scrolling foreground filter
-        filter_x1 += int(filter_vel * dt)
-        filter_x2 += int(filter_vel * dt)
-        dx1 = filter_x1 - SCREEN_WIDTH
-        dx2 = filter_x2 - SCREEN_WIDTH
-        if dx1 >= 0:
-            filter_x1 = -SCREEN_WIDTH + dx1
-        if dx2 >= 0:
-            filter_x2 = -SCREEN_WIDTH + dx2
-        screen.blit(filter_img1, (filter_x1, filter_y1))
-        screen.blit(filter_img2, (filter_x2, filter_y2))
-
-        for fish in fish_sprites:
-            if fish.selected:
-                pg.draw.circle(
-                    screen, "yellow", fish.rect.center, fish.selection_ring_radius, 5
-                )
-                # if sprite.vel.x >= 0:
-                #     outline_image = sprite.outline_image_right
-                # else:
-                #     outline_image = sprite.outline_image_left
-                # outline_rect = outline_image.get_rect(center=sprite.rect.center)
-                # screen.blit(outline_image, outline_rect)
-            if show_hitboxes:
-                pg.draw.circle(screen, "white", fish.rect.center, fish.radius, 1)
-        screen.blit(cursor.image, cursor.rect)
-        pg.display.flip()
+        if DIRTY_RECTS:
+            dirty_rects = aquarium.draw_dirty(screen, [cursor.rect])
+            screen.blit(cursor.image, cursor.rect)
+            pg.display.update(dirty_rects)
+        else:
+            aquarium.draw(screen)
+            screen.blit(cursor.image, cursor.rect)
+            pg.display.flip()
+    aquarium.close()
+    loader.shutdown()
     pg.quit()
 
 
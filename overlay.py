@@ -0,0 +1,75 @@
+"""
+Scrolling foreground "undersea" filter drawn with one blit per frame.
+
+The filter used to be two full-screen per-pixel-alpha images, underseaT1 and
+underseaT2, each blitted every frame at its own scroll position. The two images
+follow each other across the screen, so together they form a pattern repeating
+every 2 * W pixels (W the image width). ScrollingOverlay fuses them at load time
+into one display-format strip,
+
+    [img1 | img2 | img1]
+
+so that any window W wide onto the pattern is a single area of the strip and a
+frame needs one blit (of W x H pixels) rather than two.
+
+Options:
+    premultiplied   store the strip premultiplied and blit it with
+                    BLEND_PREMULTIPLIED. On pygame builds without a SIMD
+                    premultiplied blitter this is slower than plain alpha
+                    blending, so it is off by default.
+    quality "half"  keep the strip at half resolution (a quarter of the memory)
+                    and upscale the visible window each frame. This saves
+                    memory, not time: the blend is still full screen.
+
+The scroll offset is a float advanced by vel * dt and truncated only when
+drawn, so the speed does not depend on the frame rate.
+"""
+
+import pygame as pg
+
+OVERLAY_QUALITIES = ("full", "half")
+
+
+class ScrollingOverlay:
+    def __init__(self, img1, img2, vel, quality="full", premultiplied=False):
+        if quality not in OVERLAY_QUALITIES:
+            raise ValueError(f"quality must be one of {OVERLAY_QUALITIES}")
+        self.width, self.height = img1.get_size()
+        self.vel = vel  # pixels/s
+        self.offset = 0.0  # position of img1's left edge, mod period
+        self.period = 2 * self.width
+        self.quality = quality
+        self.premultiplied = premultiplied
+        w, h = self.width, self.height
+        strip = pg.Surface((3 * w, h), pg.SRCALPHA)
+        for x, img in ((0, img1), (w, img2), (2 * w, img1)):
+            # max with fully transparent zeros copies pixels exactly
+            strip.blit(img, (x, 0), special_flags=pg.BLEND_RGBA_MAX)
+        if pg.display.get_surface() is not None:
+            strip = strip.convert_alpha()
+        if quality == "half":
+            strip = pg.transform.smoothscale(strip, (3 * w // 2, h // 2))
+            self.window = pg.Surface((w, h), pg.SRCALPHA, strip)
+        if premultiplied:
+            strip = strip.premul_alpha()
+        self.strip = strip
+        self.blend = pg.BLEND_PREMULTIPLIED if premultiplied else 0
+
+    def update(self, dt):
+        self.offset = (self.offset + self.vel * dt) % self.period
+
+    def draw(self, surface, offset=None):
+        """Blits the filter at offset (default the current one) onto surface"""
+        if offset is None:
+            offset = self.offset
+        # strip column shown at screen column 0
+        start = -int(offset) % self.period
+        if self.quality == "half":
+            window = self.strip.subsurface(
+                (start // 2, 0, self.width // 2, self.height // 2)
+            )
+            pg.transform.scale(window, (self.width, self.height), self.window)
+            surface.blit(self.window, (0, 0), special_flags=self.blend)
+        else:
+            area = (start, 0, self.width, self.height)
+            surface.blit(self.strip, (0, 0), area, special_flags=self.blend)
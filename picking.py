@@ -0,0 +1,164 @@
+"""
+Mouse picking of fish through a uniform grid.
+
+Clicking used to run pg.sprite.spritecollide(cursor, fish_sprites, ...) over
+every fish, and to keep that working every Fish recomputed its collision
+radius from its image size every frame.
+
+Picker buckets fish into square cells of cell_size by their rect centre. It is
+updated incrementally: update() only moves a fish to another bucket when it has
+crossed into another cell, and given the fish centres as an array it finds
+those fish with NumPy and visits only them. pick() only looks at the cells
+within reach of the query. That is the query radius plus the largest hit radius
+of any fish, so the cost of a pick does not depend on how many fish are in the
+tank.
+
+A fish's hit radius (fish.radius) is set per species from its frame size, since
+all frames of a fish type are the same size, and changes when its frames do
+(a switch of sprite size, say). update() keeps the largest radius seen, so the
+reach of a pick always covers every fish. Candidates within the hit radius can
+be confirmed pixel-accurately against the mask of the frame they are showing.
+Masks are cached per frame surface, so each is built once.
+
+Hits come back in draw order, the topmost (last drawn) fish last. Fish are
+drawn in the order they joined the tank, which is the order update() first sees
+them in.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+from itertools import count
+from operator import attrgetter
+import numpy as np
+import pygame as pg
+
+PICK_CELL_SIZE = 64  # pixels
+HIT_RADIUS_FACTOR = 0.2  # of width + height, found by trial and error
+MASK_CACHE_SIZE = 4096  # frame masks kept
+
+
+def hit_radius(image):
+    return HIT_RADIUS_FACTOR * sum(image.get_size())
+
+
+@lru_cache(maxsize=MASK_CACHE_SIZE)
+def frame_mask(image):
+    return pg.mask.from_surface(image)
+
+
+@lru_cache(maxsize=None)
+def disc_mask(radius):
+    disc = pg.Surface((2 * radius + 1, 2 * radius + 1), pg.SRCALPHA)
+    pg.draw.circle(disc, "white", (radius, radius), radius)
+    return pg.mask.from_surface(disc)
+
+
+def touches(fish, pos, radius=0):
+    """True if an opaque pixel of fish's current frame is within radius of pos"""
+    rect = fish.rect
+    mask = frame_mask(fish.image)
+    x, y = pos
+    r = int(radius)
+    if r < 1:
+        ox, oy = int(x) - rect.x, int(y) - rect.y
+        w, h = mask.get_size()
+        return 0 <= ox < w and 0 <= oy < h and bool(mask.get_at((ox, oy)))
+    return (
+        mask.overlap(disc_mask(r), (int(x) - r - rect.x, int(y) - r - rect.y))
+        is not None
+    )
+
+
+class Picker:
+    def __init__(self, cell_size=PICK_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)  # (cx, cy) -> fish in that cell
+        self.fish_cells = {}  # fish -> (cx, cy)
+        self.draw_order = {}  # fish -> number, in the order first seen
+        self.counter = count()
+        self.max_radius = 0
+        # the fishes and cells of the last update given centres
+        self.array_fishes = None
+        self.array_cells = np.zeros((0, 2), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.fish_cells)
+
+    def update(self, fishes, centres=None):
+        """
+        Re-buckets the fishes that have crossed into another cell since the
+        last update, and drops fish no longer in fishes (a sprite group, in
+        draw order). centres, if given, is an (N, 2) array of the fishes'
+        rect centres, and fishes a list in the same order: then only the fish
+        whose cell changed since the last update with that list are visited.
+        """
+        self.max_radius = max(
+            self.max_radius, max(map(attrgetter("radius"), fishes), default=0)
+        )
+        cell_size = self.cell_size
+        if centres is None:
+            moves = (
+                (fish, (x // cell_size, y // cell_size))
+                for fish in fishes
+                for x, y in (fish.rect.center,)
+            )
+        else:
+            cells = np.floor_divide(centres, cell_size).astype(np.int64)
+            if fishes is self.array_fishes:
+                moved = np.flatnonzero((cells != self.array_cells).any(axis=1))
+            else:
+                moved = np.arange(len(fishes))
+            self.array_fishes = fishes
+            self.array_cells = cells
+            moves = zip(
+                map(fishes.__getitem__, moved.tolist()),
+                map(tuple, cells[moved].tolist()),
+            )
+        cells = self.cells
+        fish_cells = self.fish_cells
+        for fish, cell in moves:
+            old = fish_cells.get(fish)
+            if old == cell:
+                continue
+            if old is None:
+                self.draw_order[fish] = next(self.counter)
+            else:
+                cells[old].discard(fish)
+            cells[cell].add(fish)
+            fish_cells[fish] = cell
+        if len(fish_cells) > len(fishes):
+            for fish in [fish for fish in fish_cells if not fish.alive()]:
+                self.remove(fish)
+
+    def remove(self, fish):
+        cell = self.fish_cells.pop(fish, None)
+        if cell is not None:
+            self.cells[cell].discard(fish)
+            del self.draw_order[fish]
+
+    def pick(self, pos, radius=0, pixel=True):
+        """
+        Returns the fish whose hit circle (fish.radius about rect.center) comes
+        within radius of pos, in draw order (topmost last). With pixel, only
+        those that also have an opaque pixel of their current frame within
+        radius of pos.
+        """
+        x, y = pos
+        cell_size = self.cell_size
+        reach = radius + self.max_radius
+        x0, x1 = int((x - reach) // cell_size), int((x + reach) // cell_size)
+        y0, y1 = int((y - reach) // cell_size), int((y + reach) // cell_size)
+        cells = self.cells
+        hits = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for fish in cells.get((cx, cy), ()):
+                    fx, fy = fish.rect.center
+                    r = fish.radius + radius
+                    if (fx - x) ** 2 + (fy - y) ** 2 > r * r or not fish.alive():
+                        continue
+                    if pixel and not touches(fish, pos, radius):
+                        continue
+                    hits.append(fish)
+        hits.sort(key=self.draw_order.__getitem__)
+        return hits
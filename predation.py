@@ -0,0 +1,104 @@
+"""
+Predator and prey steering from a nearest-fish broadphase.
+
+Predators (fish_properties "6", "big, scary, predatory") pursue the nearest
+prey within their sense_radius. Every other fish flees the nearest predator
+within its flee_radius.
+
+Neither is answered pair by pair: crowds around a predator (a school, say)
+would make a radius query return hundreds of fish per predator. Instead there
+are two SpatialHash grids per tick, one of the prey in cells the size of the
+largest sense_radius and one of the predators in cells the size of the largest
+flee_radius. Each predator asks the prey grid, and each prey the predator grid,
+for its nearest fish (SpatialHash.nearest_many). Cells are as big as the
+radius, so only the 3 x 3 block of cells around a fish can hold one in reach,
+and only the first CANDIDATES_PER_CELL fish of each cell are looked at. In a
+crowded cell the nearest fish found may therefore not be the very nearest,
+but the cost stays one sort per grid plus a fixed amount per fish, O(N log N)
+however the fish bunch up. The candidates are gathered once per cell that
+fish ask from: the prey grid is only searched around the cells predators
+occupy, and prey with no predator in reach of their cell do no work at all. Small tanks, with at most ALL_PAIRS_LIMIT
+(predator, prey) pairs, skip the grids and check every pair, which is exact
+and cheaper at that size.
+
+Steering mirrors FishEngine.seek. The desired velocity points at full speed at
+(pursuit) or away from (flight) the other fish, and the steer is the difference
+from the current velocity, truncated to pursue_force or flee_force. These are
+much stronger than the gentle max_force of wandering, so the chase can be seen.
+Pursuit aims where the prey will be by the time the predator gets there, at
+the prey's current velocity.
+"""
+
+import numpy as np
+from spatial_hash import SpatialHash
+from vectors import steer_along, TINY
+
+CANDIDATES_PER_CELL = 8  # fish looked at in each cell of the 3 x 3 block
+ALL_PAIRS_LIMIT = 8192  # below this many pairs, skip the grid and check them all
+
+
+def nearest_within(queries, points, radius, max_per_cell):
+    """
+    (index into points, distance) of the nearest of points within radius of
+    each query point, -1 and inf where there is none
+    """
+    if len(queries) * len(points) > ALL_PAIRS_LIMIT:
+        index = SpatialHash(radius)
+        index.rebuild(points)
+        return index.nearest_many(queries, radius, max_per_cell)
+    d = queries[:, None, :] - points[None, :, :]
+    d2 = d[..., 0] * d[..., 0] + d[..., 1] * d[..., 1]
+    k = d2.argmin(axis=1)
+    dist = np.sqrt(d2[np.arange(len(queries)), k])
+    found = dist < radius
+    return np.where(found, k, -1), np.where(found, dist, np.inf)
+
+
+def predator_prey_steer(
+    pos,
+    vel,
+    predator,
+    sense_radius,
+    flee_radius,
+    max_speed,
+    pursue_force,
+    flee_force,
+    max_per_cell=CANDIDATES_PER_CELL,
+):
+    """
+    Returns the (N, 2) pursuit and flight steer of every fish. The arguments
+    are per fish: pos and vel (N, 2), predator (N,) bool and the rest (N,)
+    floats (max_speed for each fish's current state).
+    """
+    steer = np.zeros_like(pos)
+    hunters = np.flatnonzero(predator)
+    prey = np.flatnonzero(~predator)
+    if not len(hunters) or not len(prey):
+        return steer
+
+    radius = sense_radius[hunters].max()
+    if radius > 0:
+        k, dist = nearest_within(pos[hunters], pos[prey], radius, max_per_cell)
+        hunt = dist < sense_radius[hunters]
+        chasing, hunted, dist = hunters[hunt], prey[k[hunt]], dist[hunt]
+        lead = (dist / np.maximum(max_speed[chasing], TINY))[:, None]
+        target = pos[hunted] + vel[hunted] * lead
+        steer[chasing] += steer_along(
+            target - pos[chasing],
+            vel[chasing],
+            max_speed[chasing],
+            pursue_force[chasing],
+        )
+
+    radius = flee_radius[prey].max()
+    if radius > 0:
+        k, dist = nearest_within(pos[prey], pos[hunters], radius, max_per_cell)
+        flee = dist < flee_radius[prey]
+        fleeing, feared = prey[flee], hunters[k[flee]]
+        steer[fleeing] += steer_along(
+            pos[fleeing] - pos[feared],
+            vel[fleeing],
+            max_speed[fleeing],
+            flee_force[fleeing],
+        )
+    return steer
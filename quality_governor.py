@@ -0,0 +1,134 @@
+"""
+Adaptive rendering quality to hold a frame-time budget.
+
+When the tank got busy, frames simply dropped. A QualityGovernor is given the
+time each frame took, and every window frames it compares the mean with the
+budget. If the mean is over budget, it lowers quality by applying the next
+stage in STAGES. If the mean has stayed under raise_fraction of the budget for
+raise_windows windows in a row, it takes the last stage back off. Stages go on
+cheapest-looking first:
+
+    bubbles     cap live bubbles at BUBBLE_CAP (BubblePool.limit)
+    animation   look images of the fish in view up only every
+                ANIMATION_INTERVAL frames (BatchRenderer.image_interval); they
+                still move every frame
+    sprites     switch to the LOW_SPRITE_SIZE sprite sheet, so every fish blit
+                covers fewer pixels (Aquarium.set_sprite_size)
+    overlay     hide the full-screen foreground filter
+
+Fish out of view are never animated, at any level: the renderer skips their
+image look-ups altogether (BatchRenderer.view). The tank is flat, so there are
+no distant fish to animate less often, and the animation stage slows every fish
+in view alike.
+
+Halving the overlay resolution (overlay quality "half") is not a stage: it
+saves memory but not time, since the blend is still full screen (see overlay).
+
+After each change the next window is skipped, because a switch (loading the
+smaller sprites, say) can take a frame or two itself. If quality is raised and
+the very next window is over budget again, the raise is undone and the number
+of windows needed before trying again doubles. That stops the governor from
+flipping between two levels.
+
+Every decision is passed to log (print by default) and kept in decisions.
+"""
+
+FRAME_BUDGET_MS = 1000 / 60
+WINDOW_FRAMES = 30  # frames averaged for each decision
+RAISE_FRACTION = 0.6  # raise quality only with frames this far under budget
+RAISE_WINDOWS = 4  # for this many windows in a row
+
+BUBBLE_CAP = 100
+ANIMATION_INTERVAL = 3  # frames
+LOW_SPRITE_SIZE = "EIGHTH"
+
+STAGES = ("bubbles", "animation", "sprites", "overlay")
+
+
+class QualityGovernor:
+    def __init__(
+        self,
+        aquarium,
+        budget_ms=FRAME_BUDGET_MS,
+        window=WINDOW_FRAMES,
+        raise_fraction=RAISE_FRACTION,
+        raise_windows=RAISE_WINDOWS,
+        log=print,
+    ):
+        self.aquarium = aquarium
+        self.budget_ms = budget_ms
+        self.window = window
+        self.raise_fraction = raise_fraction
+        self.raise_windows = raise_windows
+        self.log = log
+        self.level = 0  # number of STAGES applied
+        self.full_sprite_size = aquarium.sprite_size
+        self.frame_ms = []
+        self.frames = 0
+        self.windows_under = 0
+        self.settling = False  # skip the window after a change
+        self.just_raised = False
+        self.decisions = []  # (frame, "lower" or "raise", stage, mean ms)
+
+    def record(self, frame_ms):
+        """Adds the time one frame took, and lowers or raises quality if due"""
+        self.frames += 1
+        self.frame_ms.append(frame_ms)
+        if len(self.frame_ms) < self.window:
+            return
+        mean_ms = sum(self.frame_ms) / len(self.frame_ms)
+        self.frame_ms = []
+        if self.settling:
+            self.settling = False
+            return
+        just_raised, self.just_raised = self.just_raised, False
+        if mean_ms > self.budget_ms:
+            self.windows_under = 0
+            if just_raised:
+                self.raise_windows *= 2
+                self.decide(
+                    "lower",
+                    mean_ms,
+                    f"backing off: next raise after "
+                    f"{self.raise_windows} windows under",
+                )
+            elif self.level < len(STAGES):
+                self.decide("lower", mean_ms)
+        elif mean_ms < self.raise_fraction * self.budget_ms and self.level:
+            self.windows_under += 1
+            if self.windows_under >= self.raise_windows:
+                self.windows_under = 0
+                self.just_raised = True
+                self.decide("raise", mean_ms)
+        else:
+            self.windows_under = 0
+
+    def decide(self, direction, mean_ms, note=""):
+        if direction == "lower":
+            stage = STAGES[self.level]
+            self.level += 1
+            self.apply(stage, True)
+        else:
+            self.level -= 1
+            stage = STAGES[self.level]
+            self.apply(stage, False)
+        self.settling = True
+        self.decisions.append((self.frames, direction, stage, mean_ms))
+        message = (
+            f"quality: {mean_ms:.1f} ms/frame against {self.budget_ms:.1f} ms "
+            f"budget at frame {self.frames}, {direction} {stage} "
+            f"(level {self.level}/{len(STAGES)})"
+        )
+        self.log(message + (f", {note}" if note else ""))
+
+    def apply(self, stage, low):
+        """Puts stage at low quality if low, otherwise back to full"""
+        tank = self.aquarium
+        if stage == "bubbles":
+            tank.bubbles.limit = BUBBLE_CAP if low else tank.bubbles.capacity
+        elif stage == "animation":
+            tank.renderer.image_interval = ANIMATION_INTERVAL if low else 1
+        elif stage == "sprites":
+            tank.set_sprite_size(LOW_SPRITE_SIZE if low else self.full_sprite_size)
+        elif stage == "overlay":
+            tank.set_overlay_enabled(not low)
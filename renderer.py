@@ -0,0 +1,284 @@
+"""
+Batched sprite drawing for kiss_fish_ai_animated.
+
+Rebuilding a combined Group every frame (all_sprites.add(...)) and then drawing
+it, followed by a second loop over the fish for selection rings and hit-boxes,
+costs Python work per sprite several times over. BatchRenderer instead keeps a
+persistent draw list per layer and submits each layer with one Surface.fblits
+call (Surface.blits with doreturn=False where fblits is not available).
+
+A layer's draw list is a list of its sprites, rebuilt only when sprites join or
+leave its LayerGroup. For layers whose sprite images never change the list holds
+the (image, rect) pairs themselves, since sprites move by updating their rect in
+place. Particle pools (e.g. bubbles.BubblePool) are layers too: they hand over
+their own (image, rect) sequence each frame.
+
+Looking up each sprite's current image is most of the Python work per sprite.
+Given a view rect, sprites whose rects lie outside it are neither looked up nor
+drawn, so fish swimming off the edge of the tank cost one rect test each. With
+image_interval above 1, the images of the sprites in view are looked up only
+every that many frames and the ones cached in between are drawn at the sprites'
+current rects, so animation advances less often but motion stays smooth.
+
+Selection rings and hit-boxes are collected in the same pass over the fish that
+builds the fish blit sequence, as blits of cached ring images, and submitted
+together in draw_overlays() so they stay on top of the scenery.
+
+DirtyTiles supports dirty-rectangle rendering: it marks the screen tiles that
+rects touch and merges dirty tiles into a few spans to redraw and update.
+"""
+
+from functools import lru_cache
+import numpy as np
+import pygame as pg
+
+SELECTION_RING_COLOUR = "yellow"
+SELECTION_RING_WIDTH = 5
+HOVER_RING_COLOUR = "cyan"
+HOVER_RING_WIDTH = 2
+HITBOX_COLOUR = "white"
+HITBOX_WIDTH = 1
+
+DIRTY_TILE_SIZE = 32  # pixels
+
+
+class LayerGroup(pg.sprite.Group):
+    """Group that counts membership changes so draw lists know when to rebuild"""
+
+    def __init__(self, *sprites):
+        self.version = 0
+        pg.sprite.Group.__init__(self, *sprites)
+
+    def add_internal(self, sprite, layer=None):
+        self.version += 1
+        pg.sprite.Group.add_internal(self, sprite, layer)
+
+    def remove_internal(self, sprite):
+        self.version += 1
+        pg.sprite.Group.remove_internal(self, sprite)
+
+
+@lru_cache(maxsize=256)
+def ring_image(colour, radius, width):
+    """Cached transparent image of a circle outline, centred in its rect"""
+    radius = max(1, radius)
+    image = pg.Surface((2 * radius + 1, 2 * radius + 1), pg.SRCALPHA)
+    pg.draw.circle(image, colour, (radius, radius), radius, width)
+    return image
+
+
+def submit(surface, sequence):
+    """Blits a sequence of (source, dest) pairs in one call"""
+    fblits = getattr(surface, "fblits", None)
+    if fblits is not None:
+        fblits(sequence)
+    else:
+        surface.blits(sequence, doreturn=False)
+
+
+class Layer:
+    def __init__(self, group, static_images=False):
+        self.group = group
+        self.static_images = static_images
+        self.version = -1
+        self.draw_list = []
+        self.images = None  # of the draw list's sprites, when cached
+
+    def refresh(self):
+        if self.version != self.group.version:
+            if self.static_images:
+                self.draw_list = [(s.image, s.rect) for s in self.group]
+            else:
+                self.draw_list = list(self.group)
+            self.images = None
+            self.version = self.group.version
+
+    def current_images(self, look_up, view=None):
+        """
+        The draw list's sprite images, looked up again if look_up. With view (a
+        Rect), sprites outside it are not looked up and get None instead.
+        """
+        draw_list = self.draw_list
+        if view is None:
+            if look_up or self.images is None:
+                self.images = [s.image for s in draw_list]
+            return self.images
+        images = self.images
+        if images is None:
+            images = [None] * len(draw_list)
+        colliderect = view.colliderect
+        self.images = [
+            (s.image if look_up or image is None else image)
+            if colliderect(s.rect)
+            else None
+            for s, image in zip(draw_list, images)
+        ]
+        return self.images
+
+
+class BatchRenderer:
+    """
+    Draws LayerGroups in the order they were added, one blit call per layer.
+    show_hitboxes draws every fish's collision circle (fish.radius) and fish
+    with fish.selected set get a selection ring (fish.selection_ring_radius), as
+    does the hovered fish, if any, in the hover colour.
+    """
+
+    def __init__(self):
+        self.layers = []
+        self.overlays = []
+        self.show_hitboxes = False
+        self.hovered = None
+        self.image_interval = 1  # frames between sprite image look-ups
+        self.view = None  # Rect; sprites outside it are skipped, None draws all
+        self.frames_drawn = 0
+
+    def add_layer(self, group, static_images=False, overlays=False):
+        """
+        Adds a layer drawn after the existing ones. With overlays, its sprites'
+        selection rings and hit-boxes are collected for draw_overlays().
+        """
+        self.layers.append((Layer(group, static_images), overlays))
+
+    def add_pool(self, pool):
+        """Adds a layer drawn after the existing ones from pool.draw_sequence()"""
+        self.layers.append((pool, False))
+
+    def sequences(self):
+        """
+        Returns a list of (image, rect) sequences, one per layer, and collects
+        the overlay rings for draw_overlays() (in self.overlays)
+        """
+        self.overlays = []
+        sequences = []
+        self.frames_drawn += 1
+        look_up = self.frames_drawn % self.image_interval == 0
+        for layer, overlays in self.layers:
+            if not isinstance(layer, Layer):
+                sequences.append(layer.draw_sequence())
+                continue
+            layer.refresh()
+            if layer.static_images:
+                sequences.append(layer.draw_list)
+            elif overlays:
+                sequences.append(
+                    self._sprites_and_overlays(
+                        layer.draw_list, layer.current_images(look_up, self.view)
+                    )
+                )
+            else:
+                images = layer.current_images(look_up, self.view)
+                sequences.append(
+                    [
+                        (image, s.rect)
+                        for image, s in zip(images, layer.draw_list)
+                        if image is not None
+                    ]
+                )
+        hovered = self.hovered
+        if hovered is not None and hovered.alive():
+            ring = ring_image(
+                HOVER_RING_COLOUR, int(hovered.selection_ring_radius), HOVER_RING_WIDTH
+            )
+            self.overlays.append((ring, ring.get_rect(center=hovered.rect.center)))
+        return sequences
+
+    def draw(self, surface):
+        for sequence in self.sequences():
+            submit(surface, sequence)
+
+    def forget_images(self):
+        """Makes the next frame look up every sprite image (e.g. after resizing)"""
+        for layer, _ in self.layers:
+            if isinstance(layer, Layer):
+                layer.images = None
+
+    def _sprites_and_overlays(self, sprites, images):
+        overlays = self.overlays
+        show_hitboxes = self.show_hitboxes
+        sequence = []
+        for sprite, image in zip(sprites, images):
+            if image is None:
+                continue  # out of view
+            rect = sprite.rect
+            sequence.append((image, rect))
+            if sprite.selected:
+                ring = ring_image(
+                    SELECTION_RING_COLOUR,
+                    int(sprite.selection_ring_radius),
+                    SELECTION_RING_WIDTH,
+                )
+                overlays.append((ring, ring.get_rect(center=rect.center)))
+            if show_hitboxes:
+                ring = ring_image(HITBOX_COLOUR, int(sprite.radius), HITBOX_WIDTH)
+                overlays.append((ring, ring.get_rect(center=rect.center)))
+        return sequence
+
+    def draw_overlays(self, surface):
+        """Draws the rings collected by the last draw()"""
+        if self.overlays:
+            submit(surface, self.overlays)
+
+
+class DirtyTiles:
+    """
+    Grid of tile_size square tiles over a screen of size (w, h).
+    mark() flags the tiles that rects touch, spans() returns the dirty tiles
+    merged into horizontal runs, runs over the same columns in consecutive rows
+    merged into one rect (clipped to the screen), and clears the grid.
+    """
+
+    def __init__(self, size, tile_size=DIRTY_TILE_SIZE):
+        self.screen_rect = pg.Rect((0, 0), size)
+        self.tile_size = tile_size
+        cols = -(-size[0] // tile_size)
+        rows = -(-size[1] // tile_size)
+        self.grid = np.zeros((rows, cols), dtype=bool)
+
+    def mark(self, rects):
+        """rects is a sequence of (x, y, w, h) or pg.Rect"""
+        if not len(rects):
+            return
+        rects = np.array(rects, dtype=np.int64).reshape(-1, 4)
+        rows, cols = self.grid.shape
+        t = self.tile_size
+        x0 = np.clip(rects[:, 0] // t, 0, cols - 1)
+        y0 = np.clip(rects[:, 1] // t, 0, rows - 1)
+        x1 = np.clip((rects[:, 0] + rects[:, 2] - 1) // t, 0, cols - 1)
+        y1 = np.clip((rects[:, 1] + rects[:, 3] - 1) // t, 0, rows - 1)
+        # rects entirely off screen clip onto the edge tiles, which is harmless
+        # 2D difference array: +1 at each rect's top left tile, -1 just past its
+        # right and bottom edges, so cumulative sums count rects covering a tile
+        diff = np.zeros((rows + 1, cols + 1), dtype=np.int32)
+        np.add.at(diff, (y0, x0), 1)
+        np.add.at(diff, (y0, x1 + 1), -1)
+        np.add.at(diff, (y1 + 1, x0), -1)
+        np.add.at(diff, (y1 + 1, x1 + 1), 1)
+        covered = diff.cumsum(axis=0).cumsum(axis=1)[:rows, :cols] > 0
+        self.grid |= covered
+
+    def mark_all(self):
+        self.grid[:] = True
+
+    def dirty_fraction(self):
+        return np.count_nonzero(self.grid) / self.grid.size
+
+    def spans(self):
+        t = self.tile_size
+        spans = []
+        open_runs = {}  # (start, stop) -> span still growing downwards
+        for row, tiles in enumerate(self.grid):
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], tiles, [0]))))
+            runs = {}
+            for start, stop in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                span = open_runs.pop((start, stop), None)
+                if span is None:
+                    span = pg.Rect(start * t, row * t, (stop - start) * t, t)
+                    spans.append(span)
+                else:
+                    # same tiles as the run above, extend that span down a row
+                    span.h += t
+                runs[start, stop] = span
+            open_runs = runs
+        self.grid[:] = False
+        return [span.clip(self.screen_rect) for span in spans]
@@ -35,6 +35,17 @@ def blit_rotate(surf, img, surf_rot_orig, img_rot_orig, angle):
     -------
     rect of blitted area on surf
 
+    """
+    rotated_image, origin = rotate_about(img, surf_rot_orig, img_rot_orig, angle)
+    surf.blit(rotated_image, origin)
+
+    return pg.Rect((*origin, *rotated_image.get_size()))
+
+
+def rotate_about(img, surf_rot_orig, img_rot_orig, angle):
+    """
+    Rotates image by angle about arbitrary rotation origin, as blit_rotate, but
+    returns (rotated image, topleft on surf) instead of blitting it.
     """
     # calc the axis aligned bounding box of the rotated image
     w, h = img.get_size()
@@ -63,8 +74,5 @@ def blit_rotate(surf, img, surf_rot_orig, img_rot_orig, angle):
     # get a rotated image
     rotated_image = pg.transform.rotate(img, angle)
 
-    # rotate and blit the image
-    surf.blit(rotated_image, origin)
-
-    return pg.Rect((*origin, *rotated_image.get_size()))
+    return rotated_image, origin
 
@@ -0,0 +1,104 @@
+"""
+Cached coral and sea-grass for the aquarium.
+
+The coral never changes, yet was blitted as two separate images every frame.
+The sea-grass sways by a small periodic angle, yet was re-rotated every frame
+with pg.transform.rotate on a large surface, plus a rotated bounding box built
+from Vector2s. Scenery instead
+
+- pre-renders the static layers (both corals) once into a single surface
+  covering just their bounding rect, RLE accelerated so the transparent gaps
+  between them cost nothing to blit, and
+- keeps a bounded cache of sea-grass images pre-rotated at angles quantized to
+  SEAGRASS_ANGLE_STEP degrees, each with its precomputed blit position, so a
+  frame is a table lookup and a blit.
+
+Both need a display mode set (convert_alpha).
+"""
+
+import math
+from collections import OrderedDict
+import pygame as pg
+from rotate_about_arb_origin import rotate_about
+
+SEAGRASS_PATH = "seagrass.png"
+CORAL_PATH = "coral.png"
+
+SEAGRASS_ANGLE_STEP = 0.05  # degrees
+SEAGRASS_CACHE_SIZE = 64  # rotated images kept
+
+
+def rle(surface):
+    surface.set_alpha(255, pg.RLEACCEL)
+    return surface
+
+
+class Scenery:
+    def __init__(self, screen_width, screen_height, seagrass=None, coral=None):
+        """seagrass and coral are the loaded images, loaded here if not given"""
+        if seagrass is None:
+            seagrass = pg.image.load(SEAGRASS_PATH)
+        if coral is None:
+            coral = pg.image.load(CORAL_PATH)
+        # sea-grass
+        seagrass_scalefactor = 0.3
+        seagrass = seagrass.convert_alpha()
+        self.seagrass = pg.transform.rotozoom(seagrass, 0, seagrass_scalefactor)
+        self.seagrass_w, self.seagrass_h = self.seagrass.get_size()
+        self.seagrass_sway_amplitude = 0.5
+        self.seagrass_sway_freq = 3.0  # rad/s
+        self.seagrass_base_pos = screen_width // 2 - 50, screen_height
+        self.seagrass_cache = OrderedDict()  # quantized angle -> (image, topleft)
+        self.time = 0.0  # s, of simulation time
+
+        # coral
+        coral0 = coral.convert_alpha()
+        coral1 = pg.transform.rotozoom(coral0, 0, 0.3)
+        coral1_w, coral1_h = coral1.get_size()
+        coral1_blit_pos = 20, screen_height - coral1_h + 20
+        coral2 = pg.transform.rotozoom(coral0, 0, 0.2)
+        coral2_w, coral2_h = coral2.get_size()
+        coral2_blit_pos = screen_width - coral2_w, screen_height - coral2_h + 20
+
+        # pre-render the static layers into one surface
+        static = ((coral1, coral1_blit_pos), (coral2, coral2_blit_pos))
+        self.static_rect = pg.Rect(static[0][1], static[0][0].get_size())
+        for image, pos in static[1:]:
+            self.static_rect.union_ip(pg.Rect(pos, image.get_size()))
+        self.static_rect = self.static_rect.clip((0, 0, screen_width, screen_height))
+        layer = pg.Surface(self.static_rect.size, pg.SRCALPHA).convert_alpha()
+        layer.fill((0, 0, 0, 0))
+        for image, (x, y) in static:
+            layer.blit(image, (x - self.static_rect.x, y - self.static_rect.y))
+        self.static_layer = rle(layer)
+
+    def update(self, dt):
+        self.time += dt
+
+    def seagrass_angle(self):
+        return self.seagrass_sway_amplitude * math.sin(
+            self.seagrass_sway_freq * self.time
+        )
+
+    def seagrass_image(self):
+        """Returns the sea-grass image at its current sway and its topleft"""
+        step = round(self.seagrass_angle() / SEAGRASS_ANGLE_STEP)
+        cache = self.seagrass_cache
+        if step in cache:
+            cache.move_to_end(step)
+            return cache[step]
+        image, origin = rotate_about(
+            self.seagrass,
+            self.seagrass_base_pos,
+            (self.seagrass_w // 2, self.seagrass_h),
+            step * SEAGRASS_ANGLE_STEP,
+        )
+        cache[step] = rle(image), origin
+        if len(cache) > SEAGRASS_CACHE_SIZE:
+            cache.popitem(last=False)
+        return cache[step]
+
+    def draw(self, surface, seagrass):
+        """Draws the coral and seagrass (from seagrass_image()) onto surface"""
+        surface.blit(self.static_layer, self.static_rect)
+        surface.blit(*seagrass)
@@ -0,0 +1,39 @@
+"""
+Event scheduler keyed by simulation time.
+
+Fish used to poll their timers every frame (is the next bubble burst due? the
+next bubble of the burst? the next state change?), so every frame touched every
+fish. With a Scheduler each fish instead registers its next deadlines once, and
+run_due(now) pops only the events whose time has come, in time order (events
+due at the same time run in the order they were scheduled).
+
+Events are (time, callback, args); callbacks are called as callback(now, *args)
+and may schedule further events, including at now (they run in the same
+run_due call).
+"""
+
+import heapq
+from itertools import count
+
+
+class Scheduler:
+    def __init__(self):
+        self.heap = []
+        self.counter = count()  # tie-breaker, keeps same-time events in order
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, time, callback, *args):
+        """Schedules callback(now, *args) for time"""
+        heapq.heappush(self.heap, (time, next(self.counter), callback, args))
+
+    def run_due(self, now):
+        """Runs every event due at or before now. Returns the number run."""
+        heap = self.heap
+        num_run = 0
+        while heap and heap[0][0] <= now:
+            _, _, callback, args = heapq.heappop(heap)
+            callback(now, *args)
+            num_run += 1
+        return num_run
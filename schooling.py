@@ -0,0 +1,133 @@
+"""
+Schooling (boids) steering for fish of the same species.
+
+Each schooling fish steers by the other schooling fish of its species nearby,
+with the three forces from Reynolds' boids:
+
+    separation  away from the centre of its close neighbours
+    alignment   towards its neighbours' mean heading
+    cohesion    towards the centre of its neighbours
+
+Summing over every pair of nearby fish is quadratic in school density: a
+school of thousands has hundreds of fish within reach of each one, and even a
+broadphase query has to produce every pair. So neither scale is answered pair
+by pair. Schooling fish are binned by (species, cell) into square cells, and
+np.bincount sums the positions and velocities in each bin. A fish's neighbours
+are then the fish of its species in the 3 x 3 block of cells around its own,
+gathered from nine lookups of the bin totals. Cells of side school_cell_size
+give the neighbours for alignment and cohesion, and cells of side
+separation_cell_size give the close ones for separation. The callers
+(FishEngine.update_interactions and, for per-fish Fish,
+Aquarium.update_interactions) pass the largest of each over the schooling fish.
+Either way it is a handful of O(N) array passes, however dense the school.
+
+This is not a neighbour radius. Every fish in the block counts, unweighted,
+from right alongside to the far corner of a diagonal cell, about 2.8 cell
+sizes away, and which fish those are depends on where the fish sits in its
+cell. That is close enough for a school's look, and why the parameters are cell
+sizes rather than radii.
+
+Each force is a seek-style steer truncated to max_force, and school_steer
+returns their weighted sum. The caller adds it to the wander steer and clamps
+the total to the fish's force limit, as FishEngine.seek does.
+"""
+
+import numpy as np
+from vectors import lengths, steer_along, TINY
+from spatial_hash import KEY_OFFSET, KEY_STRIDE
+
+BLOCK = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def bin_keys(species, cells):
+    """One int64 key per (species, cell x, cell y)"""
+    return (species * KEY_STRIDE + cells[:, 0] + KEY_OFFSET) * KEY_STRIDE + (
+        cells[:, 1] + KEY_OFFSET
+    )
+
+
+def steer_where(direction, vel, max_speed, max_force):
+    """steer_along direction, zero where there is no direction to steer along"""
+    steer = np.zeros_like(direction)
+    some = lengths(direction) > TINY
+    steer[some] = steer_along(
+        direction[some], vel[some], max_speed[some], max_force[some]
+    )
+    return steer
+
+
+def block_totals(pos, vel, species, cell_size):
+    """
+    Returns (count, sum of positions, sum of velocities) of the other fish of
+    each fish's species in the 3 x 3 block of cells around it
+    """
+    cells = np.floor(pos / cell_size).astype(np.int64)
+    keys, first, inverse, bin_count = np.unique(
+        bin_keys(species, cells),
+        return_index=True,
+        return_inverse=True,
+        return_counts=True,
+    )
+    num_bins = len(keys)
+    # per bin: count, x, y, vx, vy, plus an empty bin for missing neighbours
+    totals = np.zeros((num_bins + 1, 5))
+    totals[:-1, 0] = bin_count
+    for k, values in enumerate((pos[:, 0], pos[:, 1], vel[:, 0], vel[:, 1])):
+        totals[:-1, k + 1] = np.bincount(inverse, values, num_bins)
+    # add up each bin's block once, then hand it to every fish in the bin
+    bin_cells, bin_species = cells[first], species[first]
+    block = np.zeros((num_bins, 5))
+    for offset in BLOCK:
+        block_keys = bin_keys(bin_species, bin_cells + offset)
+        at = np.minimum(np.searchsorted(keys, block_keys), num_bins - 1)
+        block += totals[np.where(keys[at] == block_keys, at, num_bins)]
+    block = block[inverse]
+    return block[:, 0] - 1, block[:, 1:3] - pos, block[:, 3:5] - vel
+
+
+def school_steer(
+    flock,
+    pos,
+    vel,
+    species,
+    school_cell_size,
+    separation_cell_size,
+    max_speed,
+    max_force,
+    separation_weight,
+    alignment_weight,
+    cohesion_weight,
+):
+    """
+    Returns the (N, 2) schooling steer of every fish. flock is the indices of
+    the schooling fish, and school_cell_size and separation_cell_size the two
+    cell sizes. The other arguments are per fish: pos and vel (N, 2), species (N,)
+    ints and the rest (N,) floats (max_speed for each fish's current state).
+    """
+    steer = np.zeros_like(pos)
+    if not len(flock):
+        return steer
+    pos_f, vel_f, species_f = pos[flock], vel[flock], species[flock]
+    max_speed_f, max_force_f = max_speed[flock], max_force[flock]
+
+    def towards_centre(count, sum_pos):
+        offset = sum_pos / np.maximum(count, 1)[:, None] - pos_f
+        offset[count < 1] = 0
+        return offset
+
+    count, sum_pos, sum_vel = block_totals(pos_f, vel_f, species_f, school_cell_size)
+    alignment = steer_where(sum_vel, vel_f, max_speed_f, max_force_f)
+    cohesion = steer_where(
+        towards_centre(count, sum_pos), vel_f, max_speed_f, max_force_f
+    )
+    count, sum_pos, _ = block_totals(pos_f, vel_f, species_f, separation_cell_size)
+    separation = steer_where(
+        -towards_centre(count, sum_pos), vel_f, max_speed_f, max_force_f
+    )
+
+    steer[flock] = (
+        separation_weight[flock, None] * separation
+        + alignment_weight[flock, None] * alignment
+        + cohesion_weight[flock, None] * cohesion
+    )
+    return steer
@@ -0,0 +1,203 @@
+"""
+FishEngine split across worker processes over shared memory.
+
+A FishEngine step is vectorised, but it still runs on one core, and for very
+large tanks that core is the limit. ShardedFishEngine keeps every per-fish array
+(see fish_engine.ARRAYS) in multiprocessing.shared_memory and splits the slots
+into one contiguous shard per worker process. Each worker runs an ordinary
+FishEngine step over its own shard's views of those arrays.
+
+The main process keeps the full FishEngine interface over the whole arrays. It
+can add() and remove() fish between steps and read pos, state and so on to
+render. step() just publishes dt and now and waits at a barrier twice: once to
+start every worker on the tick, and once for all of them to finish. Nothing is
+copied between processes.
+
+Fish only interact in update_interactions(), which only the main process runs:
+its step() runs it over all the fish before starting the workers, and each
+shard just adds the result. So shards never need each other's data during a
+step. Successive add()s go round the shards in turn to keep them balanced.
+Capacity is fixed up front because shared arrays cannot grow. Call close() to
+stop the workers and free the shared memory.
+
+The main process waits at the barrier for at most timeout seconds. If a worker
+dies or hangs, step() raises RuntimeError naming the dead shards instead of
+blocking forever, and close() still stops the rest, terminating any that will
+not join.
+"""
+
+import os
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from fish_engine import FishEngine, ARRAYS
+
+# control block shared with the workers
+DT, NOW, STOP = range(3)
+
+# seconds the main process waits at the barrier for the workers
+BARRIER_TIMEOUT = 10.0
+
+
+def attach(name, shape, dtype):
+    """Returns (shared memory, array over it) for an existing block"""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+class ShardView(FishEngine):
+    """FishEngine over slots lo:hi of shared arrays (in a worker process)"""
+
+    def __init__(self, width, height, arrays, lo, hi, rng):
+        self.views = {name: arr[lo:hi] for name, arr in arrays.items()}
+        FishEngine.__init__(self, width, height, hi - lo, rng)
+
+    def _new_array(self, name, shape, dtype, fill):
+        return self.views[name]
+
+    def update_interactions(self):
+        """Already done over every shard by the main process"""
+
+
+def run_shard(width, height, layout, capacity, lo, hi, control_name, barrier, seed):
+    """Worker process: steps shard lo:hi on every tick until told to stop"""
+    blocks = []
+    arrays = {}
+    for name, shm_name, shape, dtype in layout:
+        shm, arrays[name] = attach(shm_name, (capacity, *shape), dtype)
+        blocks.append(shm)
+    control_shm, control = attach(control_name, (3,), np.float64)
+    engine = ShardView(width, height, arrays, lo, hi, np.random.default_rng(seed))
+    try:
+        while True:
+            barrier.wait()  # tick published
+            if control[STOP]:
+                break
+            engine.step(control[DT], control[NOW])
+            barrier.wait()  # tick done
+    except threading.BrokenBarrierError:
+        pass  # the main process gave up on the workers
+    except BaseException:
+        barrier.abort()  # don't leave the main process waiting for us
+        raise
+    del engine, arrays, control
+    for shm in blocks + [control_shm]:
+        shm.close()
+
+
+class ShardedFishEngine(FishEngine):
+    def __init__(
+        self,
+        width,
+        height,
+        capacity,
+        num_workers=None,
+        rng=None,
+        timeout=BARRIER_TIMEOUT,
+    ):
+        self.shared = {}  # array name -> SharedMemory
+        self.timeout = timeout
+        FishEngine.__init__(self, width, height, capacity, rng)
+        num_workers = min(num_workers or os.cpu_count() or 1, capacity)
+        self.num_workers = num_workers
+        self.control_shm = shared_memory.SharedMemory(create=True, size=3 * 8)
+        self.control = np.ndarray((3,), np.float64, buffer=self.control_shm.buf)
+        self.control[:] = 0
+        bounds = np.linspace(0, capacity, num_workers + 1).astype(int).tolist()
+        self.shards = list(zip(bounds[:-1], bounds[1:]))
+        # add() pops from the end: hand out slots round the shards in turn
+        longest = max(hi - lo for lo, hi in self.shards)
+        order = [
+            lo + k for k in range(longest) for lo, hi in self.shards if lo + k < hi
+        ]
+        self.free_slots = order[::-1]
+
+        layout = [
+            (name, self.shared[name].name, shape, dtype)
+            for name, shape, dtype, _ in ARRAYS
+        ]
+        seeds = self.rng.integers(0, 2**63, num_workers).tolist()
+        context = mp.get_context()
+        self.barrier = context.Barrier(num_workers + 1)
+        self.workers = [
+            context.Process(
+                target=run_shard,
+                args=(
+                    width,
+                    height,
+                    layout,
+                    capacity,
+                    lo,
+                    hi,
+                    self.control_shm.name,
+                    self.barrier,
+                    seed,
+                ),
+                daemon=True,
+            )
+            for (lo, hi), seed in zip(self.shards, seeds)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _new_array(self, name, shape, dtype, fill):
+        if name in self.shared:
+            raise RuntimeError(
+                f"ShardedFishEngine is full ({self.capacity} fish), "
+                "shared arrays cannot grow"
+            )
+        nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.shared[name] = shm
+        arr = np.ndarray(shape, dtype, buffer=shm.buf)
+        arr[...] = fill
+        return arr
+
+    def step(self, dt, now):
+        """Advances every live fish by dt seconds, each shard in its own worker"""
+        self.update_interactions()
+        self.control[DT] = dt
+        self.control[NOW] = now
+        self._wait()
+        self._wait()
+
+    def _wait(self):
+        """Waits at the barrier for the workers, raising if any died or hung"""
+        try:
+            self.barrier.wait(self.timeout)
+        except threading.BrokenBarrierError:
+            dead = [
+                f"{lo}:{hi} (exit code {worker.exitcode})"
+                for worker, (lo, hi) in zip(self.workers, self.shards)
+                if not worker.is_alive()
+            ]
+            if dead:
+                raise RuntimeError("shard worker died: " + ", ".join(dead)) from None
+            raise RuntimeError(
+                f"shard workers did not reach the barrier within {self.timeout} s"
+            ) from None
+
+    def close(self):
+        """Stops the workers and frees the shared memory"""
+        if not self.workers:
+            return
+        self.control[STOP] = 1
+        try:
+            self.barrier.wait(self.timeout)
+        except threading.BrokenBarrierError:
+            pass
+        # release any worker still waiting, e.g. after a step() that failed
+        self.barrier.abort()
+        for worker in self.workers:
+            worker.join(self.timeout)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self.workers = []
+        for name, _, _, _ in ARRAYS:
+            delattr(self, name)
+        del self.control
+        for shm in [*self.shared.values(), self.control_shm]:
+            shm.close()
+            shm.unlink()
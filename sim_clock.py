@@ -0,0 +1,95 @@
+"""
+Simulation clock, sampled once per tick and passed to every subsystem.
+
+Fish, bubbles, the sea-grass sway and the filter scroll used to read
+pg.time.get_ticks() for themselves, several times per fish per frame, so fish
+in the same frame saw slightly different times and the simulation could only
+ever run at wall-clock speed. A SimClock is advanced once per tick with the
+elapsed real time (or any fixed step, for fully synthetic time in headless runs
+and benchmarks) and everything reads its now and dt.
+
+    clock = SimClock()
+    aquarium = Aquarium(screen, clock=clock)
+    clock.tick(0.001 * pg_clock.tick(FPS))  # real time, scaled
+    aquarium.update()
+
+now is simulation time in ms (as get_ticks was), dt the last step in seconds.
+While paused, tick() advances nothing (dt is 0); scale multiplies every step.
+
+With a rate, steps(real_dt) instead runs the simulation at a fixed step of
+1 / rate seconds whatever the frame rate: the (scaled) frame time goes into an
+accumulator and steps() yields once per whole step it holds, at most
+max_substeps times per frame (the rest of a long hitch is dropped rather than
+caught up). What is left over is alpha, the fraction of a step the display is
+ahead of the simulation, for interpolating between the last two states.
+
+    clock = SimClock(rate=30)  # given to the Aquarium as above
+    for _ in clock.steps(0.001 * pg_clock.tick(FPS)):
+        aquarium.update()
+    aquarium.interpolate(clock.alpha)
+
+frame_dt is the simulation time covered by the last frame, for purely visual
+animation (the filter scroll, the sea-grass sway) that runs at display rate.
+"""
+
+MAX_SUBSTEPS = 5
+
+
+class SimClock:
+    def __init__(self, now=0.0, scale=1.0, rate=None, max_substeps=MAX_SUBSTEPS):
+        self.now = now  # ms
+        self.dt = 0.0  # s
+        self.frame_dt = 0.0  # s
+        self.scale = scale
+        self.paused = False
+        self.ticks = 0
+        self.step = None if rate is None else 1 / rate  # s
+        self.max_substeps = max_substeps
+        self.accumulator = 0.0  # s
+        self.alpha = 1.0
+
+    def _advance(self, dt):
+        self.dt = dt
+        self.now += 1000 * dt
+        self.ticks += 1
+
+    def tick(self, real_dt):
+        """Advances the clock one step by real_dt seconds of real (or synthetic) time"""
+        self.frame_dt = 0.0 if self.paused else real_dt * self.scale
+        self._advance(self.frame_dt)
+        return self.dt
+
+    def steps(self, real_dt):
+        """
+        Advances the clock through one frame of real_dt seconds, yielding after
+        each simulation step: one step of the whole frame time without a rate,
+        else as many fixed steps as are due (none while paused).
+        """
+        self.frame_dt = 0.0 if self.paused else real_dt * self.scale
+        step = self.step
+        if step is None:
+            if self.frame_dt:
+                self._advance(self.frame_dt)
+                yield
+            return
+        accumulator = self.accumulator + self.frame_dt
+        num_steps = int(accumulator // step)
+        if num_steps > self.max_substeps:
+            accumulator -= (num_steps - self.max_substeps) * step
+            num_steps = self.max_substeps
+        for _ in range(num_steps):
+            accumulator -= step
+            self.accumulator = accumulator
+            self._advance(step)
+            yield
+        self.accumulator = accumulator
+        self.alpha = accumulator / step
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def toggle_pause(self):
+        self.paused = not self.paused
@@ -0,0 +1,93 @@
+"""
+Seedable random-number service for the simulation.
+
+The simulation drew its random numbers one at a time from Python's global
+random module, unseeded, so no two runs were alike. SimRandom is backed by a
+numpy.random.Generator: give it a seed and a run is reproducible, which is what
+benchmarking and debugging need.
+
+Values are handed out from pre-drawn blocks refilled in bulk,
+
+    uniforms      block_size floats in [0, 1) at a time, from which uniform(),
+                  randint(), angle() and choice() are all derived
+    categorical   block_size indices at a time per distinct (options, weights),
+                  for weighted_choice()
+
+so a call costs one next() on a Python iterator rather than a trip into numpy.
+
+substream(key) returns an independent SimRandom derived from the same seed and
+key, so e.g. each fish can have its own stream, and what one fish draws does not
+depend on how many numbers any other fish has drawn. Batched code (FishEngine,
+BubblePool) takes substream(key).generator directly.
+"""
+
+import zlib
+import numpy as np
+
+BLOCK_SIZE = 4096
+SUBSTREAM_BLOCK_SIZE = 256
+
+
+def _stable_key(key):
+    """Substream keys may be ints or strings; str hash() is salted per process"""
+    if isinstance(key, str):
+        return zlib.crc32(key.encode())
+    return int(key)
+
+
+class SimRandom:
+    def __init__(self, seed=None, block_size=BLOCK_SIZE, seed_sequence=None):
+        if seed_sequence is None:
+            seed_sequence = np.random.SeedSequence(seed)
+        self.seed_sequence = seed_sequence
+        self.generator = np.random.default_rng(seed_sequence)
+        self.block_size = block_size
+        self.next_uniform = self._uniforms().__next__
+        self.categorical = {}  # (options, weights) -> bound __next__ of indices
+
+    def _uniforms(self):
+        generator = self.generator
+        block_size = self.block_size
+        while True:
+            yield from generator.random(block_size).tolist()
+
+    def _indices(self, weights):
+        generator = self.generator
+        block_size = self.block_size
+        p = np.asarray(weights, dtype=np.float64)
+        p = p / p.sum()
+        while True:
+            yield from generator.choice(len(p), block_size, p=p).tolist()
+
+    def substream(self, key):
+        """Independent SimRandom for key (an int or str), reproducible per seed"""
+        seed_sequence = np.random.SeedSequence(
+            self.seed_sequence.entropy,
+            spawn_key=self.seed_sequence.spawn_key + (_stable_key(key),),
+        )
+        return SimRandom(block_size=SUBSTREAM_BLOCK_SIZE, seed_sequence=seed_sequence)
+
+    def random(self):
+        return self.next_uniform()
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.next_uniform()
+
+    def randint(self, a, b):
+        """Random integer in [a, b], both inclusive, as random.randint"""
+        return a + int(self.next_uniform() * (b - a + 1))
+
+    def angle(self):
+        """Random angle in degrees, [0, 360)"""
+        return 360 * self.next_uniform()
+
+    def choice(self, seq):
+        return seq[int(self.next_uniform() * len(seq))]
+
+    def weighted_choice(self, options, weights):
+        """One of options drawn with weights, as random.choices(...)[0]"""
+        key = (tuple(options), tuple(weights))
+        draw = self.categorical.get(key)
+        if draw is None:
+            draw = self.categorical[key] = self._indices(weights).__next__
+        return options[draw()]
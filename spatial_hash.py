@@ -0,0 +1,185 @@
+"""
+Uniform-grid spatial hash for fixed-radius neighbour queries.
+
+Points are binned into square cells of side cell_size and sorted by cell, so a
+query only has to look at the handful of cells that overlap the query circle
+rather than at every point. rebuild() is cheap (one sort), so the intended use
+is to rebuild once per frame from the current positions and then run all the
+queries for that frame against it.
+
+All the heavy lifting is vectorised with NumPy: query_many() answers queries for
+a whole array of points at once and returns matching (query, point) index pairs.
+Pairs grow with how crowded the query circles are, so where only the nearest
+point matters nearest_many() keeps just that per query, from at most a fixed
+number of candidates per cell. It gathers those candidates once per distinct
+query cell, skips query cells with no point in reach, and measures a block of
+QUERY_BLOCK queries of a cell against the cell's candidates at a time.
+"""
+
+import math
+import numpy as np
+
+# cell coordinates are packed into a single int64 key
+KEY_OFFSET = 1 << 20
+KEY_STRIDE = 1 << 21
+
+# nearest_many: queries of a cell measured together, and where padding lies
+QUERY_BLOCK = 16
+FAR = 1e18
+
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.points = np.zeros((0, 2))
+        self.sorted_points = self.points
+        self.order = np.zeros(0, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _cells(self, points):
+        return np.floor(points / self.cell_size).astype(np.int64)
+
+    @staticmethod
+    def _key(cells):
+        return (cells[..., 0] + KEY_OFFSET) * KEY_STRIDE + (cells[..., 1] + KEY_OFFSET)
+
+    def rebuild(self, points):
+        """Re-bins points, an (M, 2) array. Indices returned by queries refer to it."""
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        keys = self._key(self._cells(self.points))
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_points = self.points[self.order]
+        self.keys, self.starts, self.counts = np.unique(
+            keys[self.order], return_index=True, return_counts=True
+        )
+
+    def __len__(self):
+        return len(self.points)
+
+    def query_many(self, queries, radius):
+        """
+        Finds every indexed point within radius of each query point.
+        queries is (Q, 2); radius is a scalar.
+        Returns (query_idx, point_idx) arrays of matching pairs, grouped by
+        cell rather than sorted.
+        """
+        queries = np.asarray(queries, dtype=float).reshape(-1, 2)
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(self.points) or not len(queries) or radius <= 0:
+            return empty, empty
+        reach = int(math.ceil(radius / self.cell_size))
+        cells = self._cells(queries)
+        r2 = radius * radius
+        query_idx = []
+        point_idx = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                keys = self._key(cells + (dx, dy))
+                slot = np.searchsorted(self.keys, keys)
+                slot = np.minimum(slot, len(self.keys) - 1)
+                q = np.flatnonzero(self.keys[slot] == keys)
+                if not len(q):
+                    continue
+                counts = self.counts[slot[q]]
+                # expand each (query, cell) hit into one entry per point in the cell
+                qi = np.repeat(q, counts)
+                shift = np.repeat(
+                    np.cumsum(counts) - counts - self.starts[slot[q]], counts
+                )
+                pj = np.arange(len(qi)) - shift
+                d = queries[qi] - self.sorted_points[pj]
+                inside = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] < r2
+                query_idx.append(qi[inside])
+                point_idx.append(pj[inside])
+        if not query_idx:
+            return empty, empty
+        return np.concatenate(query_idx), self.order[np.concatenate(point_idx)]
+
+    def nearest_many(self, queries, radius, max_per_cell=None):
+        """
+        Finds the nearest indexed point within radius of each query point.
+        queries is (Q, 2); radius is a scalar. If max_per_cell is given, only
+        the first max_per_cell points (in index order) of each cell are
+        candidates, so the cost per query is bounded however crowded the cells.
+        Returns (point_idx, dist) arrays of length Q, point_idx -1 and dist inf
+        where there is no point within radius.
+        """
+        queries = np.asarray(queries, dtype=float).reshape(-1, 2)
+        if not len(self.points) or not len(queries) or radius <= 0:
+            return np.full(len(queries), -1, dtype=np.int64), np.full(
+                len(queries), np.inf
+            )
+        cap = self.counts.max()
+        if max_per_cell is not None:
+            cap = min(cap, max_per_cell)
+        # candidates of each cell as indices into sorted_points, padded with a
+        # point at infinity (index M), plus a row of padding for empty cells
+        num_points, num_cells = len(self.points), len(self.keys)
+        rank = np.arange(cap)
+        table = np.full((num_cells + 1, cap), num_points)
+        table[:-1] = np.where(
+            rank < self.counts[:, None], self.starts[:, None] + rank, num_points
+        )
+        # candidates of each distinct query cell, from every cell within reach
+        reach = int(math.ceil(radius / self.cell_size))
+        block = [
+            (dx, dy)
+            for dx in range(-reach, reach + 1)
+            for dy in range(-reach, reach + 1)
+        ]
+        # queries sorted by cell, so each query cell's run of queries can share
+        # that cell's candidates
+        query_keys = self._key(self._cells(queries))
+        query_order = np.argsort(query_keys)
+        query_keys = query_keys[query_order]
+        first = np.flatnonzero(np.diff(query_keys, prepend=query_keys[0] - 1))
+        runs = np.diff(first, append=len(queries))
+        cells = self._cells(queries[query_order[first]])
+        keys = self._key(cells[:, None, :] + block)
+        slot = np.minimum(np.searchsorted(self.keys, keys), num_cells - 1)
+        slot = np.where(self.keys[slot] == keys, slot, num_cells)
+        candidates = table[slot].reshape(len(first), -1)
+        # only query cells with a point in reach are searched
+        occupied = (candidates < num_points).any(axis=1)
+        best = np.full(len(queries), -1, dtype=np.int64)
+        dist = np.full(len(queries), np.inf)
+        searched = query_order[np.repeat(occupied, runs)]
+        if not len(searched):
+            return best, dist
+        candidates = candidates[occupied]
+        runs = runs[occupied]
+        # each cell's queries in blocks of QUERY_BLOCK (the last one padded),
+        # so a block is measured against its cell's candidates in one go rather
+        # than copying the candidates out for every query
+        blocks = -(-runs // QUERY_BLOCK)
+        num_blocks = blocks.sum()
+        block_cell = np.repeat(np.arange(len(runs)), blocks)
+        rank = np.arange(len(searched)) - np.repeat(np.cumsum(runs) - runs, runs)
+        place = np.repeat((np.cumsum(blocks) - blocks) * QUERY_BLOCK, runs) + rank
+        query_cell = np.repeat(np.arange(len(runs)), runs)
+        # coordinates relative to each query cell's corner keep the float32
+        # sums below well inside its precision; padding candidates lie far away
+        corner = (cells[occupied] * self.cell_size).astype(np.float32)
+        cx = np.append(self.sorted_points[:, 0], FAR).astype(np.float32)[candidates]
+        cy = np.append(self.sorted_points[:, 1], FAR).astype(np.float32)[candidates]
+        cx -= corner[:, 0, None]
+        cy -= corner[:, 1, None]
+        # |c - q|^2 = |c|^2 - 2 q.c + |q|^2, and |q|^2 is the same for all of a
+        # query's candidates, so a batched matrix product of [qx, qy, 1] by
+        # [-2 cx, -2 cy, |c|^2] ranks them all at once
+        q = np.zeros((num_blocks * QUERY_BLOCK, 3), dtype=np.float32)
+        q[place, :2] = queries[searched] - corner[query_cell]
+        q[:, 2] = 1
+        c = np.stack((-2 * cx, -2 * cy, cx * cx + cy * cy), axis=1)
+        d2 = q.reshape(num_blocks, QUERY_BLOCK, 3) @ c[block_cell]
+        k = d2.argmin(axis=2).reshape(-1)
+        d2 = d2.reshape(len(k), -1)[np.arange(len(k)), k]
+        d2 += np.einsum("ij,ij->i", q[:, :2], q[:, :2])
+        d2 = np.maximum(d2[place], 0)
+        k = k[place]
+        found = d2 < radius * radius
+        best[searched[found]] = self.order[candidates[query_cell[found], k[found]]]
+        dist[searched[found]] = np.sqrt(d2[found])
+        return best, dist
@@ -1,10 +1,9 @@
 import os
-from itertools import cycle
 import pygame as pg
+from frame_cache import load_sheet
+from frame_atlas import FrameAtlas
 
 
-pg.init()
-
 COLOURS = ("blue", "green", "orange", "pink", "red", "yellow")
 COLOUR_INDEX = {col: i for i, col in enumerate(COLOURS)}
 NUM_COLOURS = len(COLOURS)
@@ -109,56 +108,91 @@ def get_spritesheet_row(colour, state, direction):
     )
 
 
-def get_frames(size, verbose=False):
+def get_spritesheet_path(size, fish_num):
+    info = SHEET_INFO[size.upper()]
+    return os.path.join(
+        "fish spritesheets", info["DIR"], info["STEM"] + fish_num + ".png"
+    )
+
+
+def get_frame_rects(size, fish_num):
     """
-    Returns dictionary of cycled animation frames for requested size.
+    Returns {key: [(x, y, w, h), ...]} locating every animation frame of fish
+    type fish_num on its spritesheet, with keys as in get_frames.
+    """
+    size = size.upper()
+    image_size = SHEET_INFO[size]["IMAGE_SIZES"][fish_num]
+    frame_width, frame_height = SHEET_INFO[size]["FRAME_SIZE"]
+    rects = {}
+    for colour in COLOURS:
+        for state, n in zip(STATES, NUM_FRAMES):
+            # fishtypes 1, 4 and 5 have no swim chomp animation frames
+            if fish_num in "145" and state == "swim-chomp":
+                continue
+            for direction in DIRECTIONS:
+                key = fish_num + "_" + colour + "_" + state + "_" + direction
+                y = get_spritesheet_row(colour, state, direction) * frame_height
+                rects[key] = [(j * frame_width, y, *image_size) for j in range(n)]
+    return rects
+
+
+def get_frames(size, verbose=False, use_cache=True, atlas=None):
+    """
+    Returns dictionary of animation frame tuples for requested size.
     Dictionary keys are:
         key = fish_num + "_" + colour + "_" + state + "_" + direction
     NB: constructing a key in this way is faster than nested dictionaries which
     is important since the animation frames are accessed at the frame rate for
     potentially large numbers of fish.
 
+    With use_cache, decoded sheets are memory-mapped from the frame cache (see
+    frame_cache) instead of decoding the PNGs on every start.
+
+    The tuples are shared by every fish of a type and never advanced; each fish
+    keeps its own frame cursor and indexes them (frames[i % len(frames)]).
+
+    atlas "subsurface" or "rle" returns render-ready frames from a display-format
+    FrameAtlas per sheet (see frame_atlas) instead of plain SRCALPHA surfaces.
     """
 
     size = size.upper()
-    directory = SHEET_INFO[size]["DIR"]
-    stem = SHEET_INFO[size]["STEM"]
-    image_sizes = SHEET_INFO[size]["IMAGE_SIZES"]
-    frame_width, frame_height = SHEET_INFO[size]["FRAME_SIZE"]
 
     fish_frames = {}
 
     for i in range(1, 7):
         fish_num = str(i)
-        path = os.path.join("fish spritesheets", directory, stem + fish_num + ".png")
+        path = get_spritesheet_path(size, fish_num)
         if verbose:
             print(f"Fish type {i}: loading spritesheet {path}")
-        spritesheet = pg.image.load(path)
-        for colour in COLOURS:
-            for state, n in zip(STATES, NUM_FRAMES):
-                # fishtypes 1, 4 and 5 have no swim chomp animation frames
-                if i in [1, 4, 5] and state == "swim-chomp":
-                    continue
-                for direction in DIRECTIONS:
-                    frames = []
-                    for j in range(n):
-                        key = fish_num + "_" + colour + "_" + state + "_" + direction
-                        frame = pg.Surface(image_sizes[fish_num], pg.SRCALPHA)
-                        x, y = (
-                            j * frame_width,
-                            get_spritesheet_row(colour, state, direction)
-                            * frame_height,
-                        )
-                        # print(x,y)
-                        frame.blit(spritesheet, (-x, -y))
-                        frames.append(frame)
-                    fish_frames[key] = cycle(frames)
+        frame_rects = get_frame_rects(size, fish_num)
+        if use_cache:
+            sheet = load_sheet(path, frame_rects, verbose=verbose)
+            if atlas is None:
+                for key in frame_rects:
+                    fish_frames[key] = tuple(sheet.get_frames(key))
+                continue
+            spritesheet = sheet.band(0, sheet.size[1])
+        else:
+            spritesheet = pg.image.load(path)
+        if atlas is not None:
+            frame_atlas = FrameAtlas(spritesheet, frame_rects, atlas)
+            for key in frame_rects:
+                fish_frames[key] = frame_atlas.get_frames(key)
+            continue
+        for key, rects in frame_rects.items():
+            frames = []
+            for x, y, w, h in rects:
+                frame = pg.Surface((w, h), pg.SRCALPHA)
+                frame.blit(spritesheet, (-x, -y))
+                frames.append(frame)
+            fish_frames[key] = tuple(frames)
     return fish_frames
 
 
 def main():
     width, height = 900, 600
     fps = 60
+    pg.display.init()
     screen = pg.display.set_mode((width, height))
     clock = pg.time.Clock()
     # check animations
@@ -173,6 +207,7 @@ def main():
                     key = str(i) + "_" + colour + "_" + state + "_" + direction
                     print(key)
                     start_time = pg.time.get_ticks()
+                    frame_index = 0
                     while pg.time.get_ticks() - start_time < duration:
                         for event in pg.event.get():
                             if event.type == pg.QUIT:
@@ -183,7 +218,9 @@ def main():
                         clock.tick(fps)
                         screen.fill("black")
                         try:
-                            frame = next(fish_frames[key])
+                            frames = fish_frames[key]
+                            frame = frames[frame_index % len(frames)]
+                            frame_index += 1
                         except:
                             print("not found")
                             break
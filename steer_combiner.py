@@ -1,6 +1,8 @@
 from random import uniform
+import numpy as np
 import pygame as pg
-from trunc_sum import trunc_sum
+from trunc_sum import trunc_sum, trunc_sum_batch
+from vectors import lengths, truncate, TINY
 
 """
 Combining steering behaviours, e.g. wander, seek, evade using priorities and weights.
@@ -113,3 +115,150 @@ def combined_steer(params, priority_ordered_info):
     if total_steer.length() < max_force:
         total_steer.scale_to_length(max_force)
     return total_steer, steers
+
+
+"""
+Batched versions of the above for N agents at once.
+
+Agent state is passed as arrays: pos and vel are (N, 2), max_speed and max_force
+are scalars or (N,) arrays. Seek and evade take T targets at a time, either
+shared by all agents (T, 2) or per agent (N, T, 2), and return one weighted steer
+component per target, shape (N, T, 2). Components for targets outside the detect
+radius are zero, exactly as in the scalar functions.
+"""
+
+
+def wander_steer_batch(
+    pos, vel, max_speed, max_force, ring_radius, ring_distance, weight, rng=None
+):
+    rng = np.random.default_rng() if rng is None else rng
+    pos = np.asarray(pos, dtype=float)
+    vel = np.asarray(vel, dtype=float)
+    n = len(pos)
+    max_speed = np.broadcast_to(np.asarray(max_speed, dtype=float), (n,))
+    speed = lengths(vel)
+    stopped = speed == 0
+    if stopped.any():
+        # as in wander_steer, give stationary agents a random velocity
+        angle = rng.uniform(0, 2 * np.pi, n)
+        random_vel = (rng.uniform(0, 1, n) * max_speed)[:, None] * np.stack(
+            (np.cos(angle), np.sin(angle)), axis=1
+        )
+        vel = np.where(stopped[:, None], random_vel, vel)
+        speed = lengths(vel)
+    future_pos = pos + vel / np.maximum(speed, TINY)[:, None] * ring_distance
+    angle = rng.uniform(0, 2 * np.pi, n)
+    target_pos = future_pos + ring_radius * np.stack(
+        (np.cos(angle), np.sin(angle)), axis=1
+    )
+    offset = target_pos - pos
+    desired_vel = (
+        offset / np.maximum(lengths(offset), TINY)[:, None] * max_speed[:, None]
+    )
+    return weight * truncate(desired_vel - vel, max_force)
+
+
+def _target_offsets(pos, target_pos):
+    """Returns (N, T, 2) offsets target - agent for shared or per-agent targets."""
+    pos = np.asarray(pos, dtype=float)
+    target_pos = np.asarray(target_pos, dtype=float)
+    if target_pos.ndim == 2:
+        target_pos = target_pos[None, :, :]
+    return target_pos - pos[:, None, :]
+
+
+def seek_steer_batch(
+    pos,
+    vel,
+    max_speed,
+    max_force,
+    target_pos,
+    target_weight,
+    detect_radius,
+    approach_radius,
+    weight,
+):
+    dist = _target_offsets(pos, target_pos)
+    vel = np.asarray(vel, dtype=float)[:, None, :]
+    max_speed = np.asarray(max_speed, dtype=float).reshape(-1, 1)
+    length = lengths(dist)
+    inside = (detect_radius > length) & (length > 0)
+    desired_vel = dist / np.maximum(length, TINY)[..., None] * max_speed[..., None]
+    approach = np.minimum(length / approach_radius, 1)
+    desired_vel *= approach[..., None]
+    steer = truncate(
+        desired_vel - vel, np.asarray(max_force, dtype=float).reshape(-1, 1)
+    )
+    steer *= (inside * np.asarray(target_weight, dtype=float) * weight)[..., None]
+    return steer
+
+
+def evade_steer_batch(
+    pos, vel, max_speed, max_force, target_pos, target_weight, detect_radius, weight
+):
+    dist = -_target_offsets(pos, target_pos)  # opposite sign to seek
+    vel = np.asarray(vel, dtype=float)[:, None, :]
+    max_speed = np.asarray(max_speed, dtype=float).reshape(-1, 1)
+    length = lengths(dist)
+    inside = (detect_radius > length) & (length > 0)
+    desired_vel = dist / np.maximum(length, TINY)[..., None] * max_speed[..., None]
+    steer = truncate(
+        desired_vel - vel, np.asarray(max_force, dtype=float).reshape(-1, 1)
+    )
+    steer *= (inside * np.asarray(target_weight, dtype=float) * weight)[..., None]
+    return steer
+
+
+def combined_steer_batch(max_force, components, priorities=None):
+    """
+    Weighted prioritised truncated sum for N agents at once.
+
+    components is a list of weighted steer arrays, each (N, 2) for a single
+    behaviour (e.g. wander) or (N, T, 2) for one component per target (seek,
+    evade). priorities gives one number per entry of components (lower is
+    considered first); if None, components are taken in the order given.
+
+    Each agent accumulates components in priority order until it reaches
+    max_force; the component that overshoots is truncated with trunc_sum_batch
+    and that agent is masked out of the rest of the sum. The loop stops early
+    once every agent is saturated.
+
+    Returns total steer (N, 2) and the applied components (N, K, 2) in priority
+    order, together with the index into components each column came from.
+    """
+    if priorities is None:
+        priorities = range(len(components))
+    order = sorted(range(len(components)), key=lambda k: priorities[k])
+    columns = []
+    sources = []
+    for k in order:
+        c = np.asarray(components[k], dtype=float)
+        if c.ndim == 2:
+            c = c[:, None, :]
+        columns.append(c)
+        sources.extend([k] * c.shape[1])
+    steers = np.concatenate(columns, axis=1)
+    n = steers.shape[0]
+    max_force = np.broadcast_to(np.asarray(max_force, dtype=float), (n,))
+    applied = np.zeros_like(steers)
+    total = np.zeros((n, 2))
+    active = np.ones(n, dtype=bool)
+    for j in range(steers.shape[1]):
+        idx = np.flatnonzero(active)
+        if not len(idx):
+            break
+        steer = steers[idx, j]
+        new_total = total[idx] + steer
+        over = lengths(new_total) >= max_force[idx]
+        if over.any():
+            o = idx[over]
+            # add as much of this steer as possible up to max_force
+            steer[over] = trunc_sum_batch(total[o], steers[o, j], max_force[o])
+            new_total[over] = total[o] + steer[over]
+            active[o] = False
+        applied[idx, j] = steer
+        total[idx] = new_total
+    length = lengths(total)
+    short = (length < max_force) & (length > 0)
+    total[short] *= (max_force[short] / length[short])[:, None]
+    return total, applied, np.array(sources, dtype=int)
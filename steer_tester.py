@@ -1,6 +1,13 @@
 from random import randrange, uniform, choices, randint
+import numpy as np
 import pygame as pg
-from steer_combiner import combined_steer
+from steer_combiner import (
+    combined_steer,
+    combined_steer_batch,
+    wander_steer_batch,
+    seek_steer_batch,
+    evade_steer_batch,
+)
 from angle_clamper import clamp_angle_to_horizontal
 
 """
@@ -16,6 +23,9 @@ vec = pg.math.Vector2
 
 BOUNCE_MARGIN = 20
 
+# steer all agents at once with Swarm (steer_combiner batch API)
+USE_BATCH_STEER = True
+
 BEHAVIOUR_COLOURS = {"wander": "blue", "seek": "green", "evade": "red"}
 SF = 200
 
@@ -58,6 +68,7 @@ class Agent(pg.sprite.Sprite):
         self.rect = self.image.get_rect(center=self.pos)
 
         self.targets = {"seek": {}, "evade": {}}
+        self.steers = []
 
         # state handling
         # TODO better as single dictionary of state-dependent properties?
@@ -180,9 +191,17 @@ class Agent(pg.sprite.Sprite):
                         )
                     )
         total_steer, self.steers = combined_steer(params, priority_ordered_info)
-        friction_force = (
-            -self.friction_coeff * self.vel.length_squared() * total_steer.normalize()
-        )
+        self.apply_steer(total_steer)
+
+    def apply_steer(self, total_steer):
+        if total_steer.length_squared() > 0:
+            friction_force = (
+                -self.friction_coeff
+                * self.vel.length_squared()
+                * total_steer.normalize()
+            )
+        else:
+            friction_force = vec(0, 0)
         force = total_steer + friction_force
         self.acc = force / self.mass
         self.vel += self.acc
@@ -247,6 +266,113 @@ class Agent(pg.sprite.Sprite):
         self.rect.center = self.pos
 
 
+class Swarm:
+    """
+    Steers a list of Agents together using the batch API in steer_combiner.
+    As in the per-agent path, each agent has its own position and weight for
+    every seek and evade target. They are kept in (N, T, 2) and (N, T) arrays
+    per kind rather than in per-agent dicts, so nothing is rebuilt each frame,
+    and the batch steers ignore targets outside an agent's detect radius. All
+    agents share the behaviour weights, radii and priority order of the first
+    agent.
+    """
+
+    def __init__(self, agents):
+        self.agents = agents
+        self.target_ids = {"seek": [], "evade": []}
+        n = len(agents)
+        self.target_pos = {kind: np.zeros((n, 0, 2)) for kind in self.target_ids}
+        self.target_weight = {kind: np.zeros((n, 0)) for kind in self.target_ids}
+        self.rng = np.random.default_rng()
+
+    def add_target(self, kind, id, pos, weight):
+        """pos is each agent's (x, y) for the target and weight its weight"""
+        self.target_ids[kind].append(id)
+        self.target_pos[kind] = np.concatenate(
+            (self.target_pos[kind], np.asarray(pos, dtype=float)[:, None, :]), axis=1
+        )
+        self.target_weight[kind] = np.concatenate(
+            (self.target_weight[kind], np.asarray(weight, dtype=float)[:, None]),
+            axis=1,
+        )
+
+    def remove_target(self, kind, id):
+        if id in self.target_ids[kind]:
+            k = self.target_ids[kind].index(id)
+            del self.target_ids[kind][k]
+            self.target_pos[kind] = np.delete(self.target_pos[kind], k, axis=1)
+            self.target_weight[kind] = np.delete(self.target_weight[kind], k, axis=1)
+
+    def draw_targets(self, screen):
+        for kind in ("seek", "evade"):
+            for targets, weights in zip(
+                self.target_pos[kind].tolist(), self.target_weight[kind].tolist()
+            ):
+                for pos, weight in zip(targets, weights):
+                    pg.draw.circle(
+                        screen, BEHAVIOUR_COLOURS[kind], pos, int(5 * weight)
+                    )
+
+    def update(self, debug=False):
+        agents = self.agents
+        if not agents:
+            return
+        for agent in agents:
+            agent.update_state()
+        a = agents[0]
+        pos = np.array([agent.pos for agent in agents])
+        vel = np.array([agent.vel for agent in agents])
+        max_speed = np.array([agent.max_speed for agent in agents])
+        max_force = np.array([agent.max_force for agent in agents])
+        components = {
+            "wander": wander_steer_batch(
+                pos,
+                vel,
+                max_speed,
+                max_force,
+                a.wander_ring_radius,
+                a.wander_ring_distance,
+                a.wander_weight,
+                self.rng,
+            ),
+            "seek": seek_steer_batch(
+                pos,
+                vel,
+                max_speed,
+                max_force,
+                self.target_pos["seek"],
+                self.target_weight["seek"],
+                a.seek_detect_radius,
+                a.seek_approach_radius,
+                a.seek_weight,
+            ),
+            "evade": evade_steer_batch(
+                pos,
+                vel,
+                max_speed,
+                max_force,
+                self.target_pos["evade"],
+                self.target_weight["evade"],
+                a.evade_detect_radius,
+                a.evade_weight,
+            ),
+        }
+        behaviours = a.behaviour_priority_order
+        total, applied, sources = combined_steer_batch(
+            max_force, [components[b] for b in behaviours]
+        )
+        for i, agent in enumerate(agents):
+            if debug:
+                agent.steers = [
+                    (behaviours[k], vec(*steer))
+                    for k, steer in zip(sources, applied[i])
+                    if steer.any()
+                ]
+            agent.apply_steer(vec(*total[i]))
+            agent.handle_walls()
+            agent.rect.center = agent.pos
+
+
 def main():
     fps = 60
     screen_width, screen_height = 900, 600
@@ -258,6 +384,7 @@ def main():
     agents = []
     for _ in range(num_fish):
         agents.append(Agent(screen, all_sprites))
+    swarm = Swarm(agents) if USE_BATCH_STEER else None
     running = True
     paused = False
     debug = True
@@ -274,44 +401,44 @@ def main():
                     paused = not paused
                 if event.key == pg.K_d:
                     debug = not debug
-                if event.key == pg.K_s:
-                    # add seek target
-                    for agent in agents:
-                        agent.add_target(
-                            "seek",
-                            "seek" + str(target_counter),
-                            {
-                                "pos": (
-                                    randrange(0, screen_width),
-                                    randrange(0, screen_height),
-                                ),
-                                "weight": uniform(0.5, 10),
-                            },
-                        )
-                    target_counter += 1
-                if event.key == pg.K_e:
-                    # add evade target
-                    for agent in agents:
-                        agent.add_target(
-                            "evade",
-                            "evade" + str(target_counter),
-                            {
-                                "pos": (
-                                    randrange(0, screen_width),
-                                    randrange(0, screen_height),
-                                ),
-                                "weight": 1,
-                            },
+                if event.key in (pg.K_s, pg.K_e):
+                    kind = "seek" if event.key == pg.K_s else "evade"
+                    id = kind + str(target_counter)
+                    # a different position and weight for every agent
+                    targets = [
+                        {
+                            "pos": (
+                                randrange(0, screen_width),
+                                randrange(0, screen_height),
+                            ),
+                            "weight": uniform(0.5, 10) if kind == "seek" else 1,
+                        }
+                        for _ in agents
+                    ]
+                    if swarm is not None:
+                        swarm.add_target(
+                            kind,
+                            id,
+                            [target["pos"] for target in targets],
+                            [target["weight"] for target in targets],
                         )
+                    else:
+                        for agent, target in zip(agents, targets):
+                            agent.add_target(kind, id, target)
                     target_counter += 1
         screen.fill("black")
         if not paused:
-            all_sprites.update()
+            if swarm is not None:
+                swarm.update(debug)
+            else:
+                all_sprites.update()
         all_sprites.draw(screen)
         for sprite in all_sprites:
             if debug:
                 sprite.debug()
                 sprite.draw_targets()
+        if debug and swarm is not None:
+            swarm.draw_targets(screen)
         pg.display.set_caption(f"{clock.get_fps():.0f}")
         pg.display.flip()
     pg.quit()
@@ -1,3 +1,4 @@
+import numpy as np
 import pygame as pg
 from time import time
 
@@ -34,6 +35,29 @@ def trunc_sum(v1, v2, d):
     return wneg * v2
 
 
+def trunc_sum_batch(v1, v2, d):
+    """
+    Vectorised trunc_sum for N pairs of vectors.
+    v1, v2 are (N, 2) arrays and d is a scalar or (N,) array.
+    Returns the (N, 2) array w * v2 with |v1 + w * v2| = d.
+    Rows where |v1| is already >= d (or v2 is zero) get w = 0 rather than
+    raising, so callers can pass a whole population at once.
+    """
+    v1 = np.asarray(v1, dtype=float)
+    v2 = np.asarray(v2, dtype=float)
+    d = np.abs(np.broadcast_to(d, v1.shape[:1]))
+    a = np.einsum("ij,ij->i", v2, v2)
+    b = 2 * np.einsum("ij,ij->i", v1, v2)
+    c = np.einsum("ij,ij->i", v1, v1) - d * d
+    ok = (c < -TINY) & (a > 0)
+    a = np.where(ok, a, 1)
+    # c < 0 so the discriminant is positive and the roots have opposite signs,
+    # hence the positive root is always the one we want
+    det = np.sqrt(np.maximum(b * b - 4 * a * c, 0))
+    w = np.where(ok, 0.5 * (-b + det) / a, 0)
+    return w[:, None] * v2
+
+
 def main():
     # demo use
     #
@@ -45,6 +69,9 @@ def main():
     v_sum = v1 + scaled_v2
     # expect v_sum = [4,3], length = 5
     print(v_sum, v_sum.length())
+    # same again, batched
+    scaled_v2 = trunc_sum_batch([[0, 3], [3, 0]], [[1, 0], [0, 1]], 5)
+    print(scaled_v2)
 
 
 if __name__ == "__main__":
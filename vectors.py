@@ -0,0 +1,35 @@
+"""
+Array helpers shared by the batched steering code (fish_engine, predation,
+schooling, steer_combiner). Vectors are the last axis of an array, e.g. (N, 2)
+positions or (N, T, 2) steer components.
+"""
+
+import numpy as np
+
+TINY = 1e-8  # guard against normalising zero-length vectors
+
+
+def lengths(v):
+    """Length of each vector in v (..., 2)"""
+    return np.sqrt(np.sum(v * v, axis=-1))
+
+
+def truncate(v, max_length):
+    """
+    Scales vectors of v (..., 2) down to max_length where they exceed it.
+    max_length is a scalar or an array of the leading dimensions of v (or a
+    prefix of them).
+    """
+    length = lengths(v)
+    max_length = np.asarray(max_length, dtype=float)
+    max_length = max_length.reshape(
+        max_length.shape + (1,) * (v.ndim - 1 - max_length.ndim)
+    )
+    scale = np.where(length > max_length, max_length / np.maximum(length, TINY), 1)
+    return v * scale[..., None]
+
+
+def steer_along(offset, vel, max_speed, max_force):
+    """Steer (N, 2) towards full speed along offset, truncated to max_force"""
+    desired = offset * (max_speed / np.maximum(lengths(offset), TINY))[:, None]
+    return truncate(desired - vel, max_force)